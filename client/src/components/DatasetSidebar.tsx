@@ -18,7 +18,6 @@ import {
   Storage,
   TableChartOutlined,
 } from "@mui/icons-material";
-import { generateSuggestedMapping } from "../utils/api";
 import router from "next/router";
 
 interface SidebarProps {
@@ -105,11 +104,8 @@ export default function DatasetSidebar({
   }, []);
 
   const handleProceedWithMapping = async () => {
-    setIsLoading(true);
-    const schemaData = localStorage.getItem("schemaAnalysis");
-    const response = await generateSuggestedMapping(JSON.parse(schemaData));
-    localStorage.setItem("suggestedMapping", JSON.stringify({...response}));
-    setIsLoading(false);
+    // The suggested mapping page streams the mappings in as they are generated
+    localStorage.removeItem("suggestedMapping");
     router.push("/suggested-mapping");
   };
 
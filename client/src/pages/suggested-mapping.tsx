@@ -1,7 +1,8 @@
 import React, { useEffect, useState } from "react";
-import { Box, Typography, CircularProgress, Alert, Button, Chip } from "@mui/material";
+import { Box, Typography, CircularProgress, LinearProgress, Alert, Button, Chip } from "@mui/material";
 import { AccountTree, AutoAwesome } from "@mui/icons-material";
 import MappingGrid from "../components/MappingGrid";
+import { streamSuggestedMapping, submitMergeJob, waitForMergeJob, cancelMergeJob, MergeJob } from "../utils/api";
 
 interface Mapping {
   id: string | number;
@@ -17,36 +18,81 @@ const SuggestedMapping = () => {
   const [mappings, setMappings] = useState<Mapping[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Target tables the model failed to map; the rest of the mappings are still shown
+  const [warnings, setWarnings] = useState<string[]>([]);
   const [isMerging, setIsMerging] = useState(false);
+  const [streaming, setStreaming] = useState(false);
+  const [mergeJob, setMergeJob] = useState<MergeJob | null>(null);
 
   useEffect(() => {
+    // Ensure each mapping has a unique ID
+    const withIds = (mappingData: any[]) =>
+      mappingData.map((item: any, index: number) => ({
+        ...item,
+        id: item.id || index,
+      }));
+    let streamStarted = false;
+    // Remounts (and StrictMode's double effect) must not leave a second stream running
+    const controller = new AbortController();
+
     try {
       const suggestedMapping = localStorage.getItem("suggestedMapping");
-      if (!suggestedMapping) {
-        throw new Error("No mapping data found. Please generate mappings first.");
-      }
+      if (suggestedMapping) {
+        const parsed = JSON.parse(suggestedMapping);
+        const mappingData = parsed?.mapping_response?.mappings || [];
+
+        if (!Array.isArray(mappingData)) {
+          throw new Error("Invalid mapping data format");
+        }
 
-      const parsed = JSON.parse(suggestedMapping);
-      const mappingData = parsed?.mapping_response?.mappings || [];
-      
-      if (!Array.isArray(mappingData)) {
-        throw new Error("Invalid mapping data format");
+        setMappings(withIds(mappingData));
+        setWarnings(parsed?.warnings || []);
+        setError(null);
+        return;
       }
 
-      // Ensure each mapping has a unique ID
-      const mappedData = mappingData.map((item: any, index: number) => ({
-        ...item,
-        id: item.id || index,
-      }));
+      const schemaData = localStorage.getItem("schemaAnalysis");
+      if (!schemaData) {
+        throw new Error("No mapping data found. Please generate mappings first.");
+      }
 
-      setMappings(mappedData);
-      setError(null);
+      // Show each mapping as soon as it has been generated
+      streamStarted = true;
+      setStreaming(true);
+      streamSuggestedMapping(JSON.parse(schemaData), (mapping) => {
+        setMappings((current) => [...current, mapping]);
+        setLoading(false);
+      }, controller.signal)
+        .then((response) => {
+          localStorage.setItem("suggestedMapping", JSON.stringify({ ...response }));
+          setMappings(withIds(response?.mapping_response?.mappings || []));
+          setWarnings(response?.warnings || []);
+          setError(null);
+        })
+        .catch((err) => {
+          if (controller.signal.aborted) {
+            return;
+          }
+          console.error("Error streaming mappings:", err);
+          setError(err instanceof Error ? err.message : "Failed to load mappings");
+        })
+        .finally(() => {
+          if (controller.signal.aborted) {
+            return;
+          }
+          setStreaming(false);
+          setLoading(false);
+        });
     } catch (err) {
       console.error("Error loading mappings:", err);
       setError(err instanceof Error ? err.message : "Failed to load mappings");
     } finally {
-      setLoading(false);
+      if (!streamStarted) {
+        setLoading(false);
+      }
     }
+
+    return () => controller.abort();
   }, []);
 
   if (loading) {
@@ -68,12 +114,15 @@ const SuggestedMapping = () => {
   const handleMap = async () => {
     try {
       setIsMerging(true);
-      const res = await fetch("http://localhost:8000/api/run-merge", {
-        method: "POST",
-      });
-      if (!res.ok) {
-        const body = await res.json().catch(() => ({}));
-        throw new Error(body?.error || `Merge failed with status ${res.status}`);
+      // Merges run as background jobs; poll until this one finishes
+      const submitted = await submitMergeJob();
+      setMergeJob(submitted);
+      const job = await waitForMergeJob(submitted.job_id, setMergeJob);
+      if (job.status === "cancelled") {
+        return;
+      }
+      if (job.status !== "succeeded") {
+        throw new Error(job.error || `Merge ${job.status}`);
       }
       // eslint-disable-next-line no-alert
       alert("Dataset merged and downloaded");
@@ -82,9 +131,20 @@ const SuggestedMapping = () => {
       alert(e?.message || "Failed to run merge");
     } finally {
       setIsMerging(false);
+      setMergeJob(null);
     }
   };
 
+  const handleCancelMerge = async () => {
+    if (mergeJob) {
+      await cancelMergeJob(mergeJob.job_id).catch((e) => console.error("Failed to cancel merge:", e));
+    }
+  };
+
+  const mergeLabel = mergeJob?.stage
+    ? `Merging: ${mergeJob.stage} (${mergeJob.step}/${mergeJob.total_steps})`
+    : mergeJob?.status === "queued" ? "Queued..." : "Mapping...";
+
   return (
       <Box sx={{ margin: "1rem" }}>
         <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between', mb: 1, py: 0.5 }}>
@@ -112,10 +172,26 @@ const SuggestedMapping = () => {
               sx={{ fontSize: '0.75rem', height: 24 }}
             />
           </Box>
-          <Button variant="contained" onClick={handleMap} disabled={isMerging} size="small">
-            {isMerging ? "Mapping..." : "Run Merge"}
-          </Button>
+          <Box sx={{ display: 'flex', gap: 1 }}>
+            {isMerging && mergeJob && (
+              <Button variant="outlined" onClick={handleCancelMerge} size="small">
+                Cancel
+              </Button>
+            )}
+            <Button variant="contained" onClick={handleMap} disabled={isMerging} size="small">
+              {isMerging ? mergeLabel : "Run Merge"}
+            </Button>
+          </Box>
         </Box>
+      {warnings.length > 0 && (
+        <Alert severity="warning" sx={{ mb: 1 }}>
+          Some tables could not be mapped:
+          {warnings.map((warning) => (
+            <div key={warning}>{warning}</div>
+          ))}
+        </Alert>
+      )}
+      {streaming && <LinearProgress sx={{ mb: 1 }} />}
       <MappingGrid data={mappings} />
     </Box>
   );
@@ -93,4 +93,112 @@ export const generateSuggestedMapping = async (schemaAnalysis: SchemaAnalysis) =
     throw error;
   }
 };
-  
\ No newline at end of file
+  
+// Streams suggested mappings over server-sent events. onMapping is called for
+// each mapping as soon as the model has written it; the promise resolves with
+// the merged response (same shape as generateSuggestedMapping).
+// EventSource only supports GET, so the stream is read from a fetch body.
+// Aborting signal closes the connection; the server then cancels the model streams still in progress.
+export const streamSuggestedMapping = async (
+  schemaAnalysis: SchemaAnalysis,
+  onMapping: (mapping: any) => void,
+  signal?: AbortSignal
+) => {
+  const response = await fetch(`${API_BASE_URL}/api/generate-suggested-mapping/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({
+      ...schemaAnalysis,
+    }),
+    signal,
+  });
+
+  if (!response.ok || !response.body) {
+    const errorData = await response.json().catch(() => ({}));
+    throw new Error(errorData.error || 'Failed to generate mapping');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (!data) continue;
+
+      const payload = JSON.parse(data);
+      if (event === 'mapping') {
+        onMapping(payload);
+      } else if (event === 'done') {
+        return payload;
+      } else if (event === 'error') {
+        throw new Error(payload.error || 'Failed to generate mapping');
+      }
+    }
+  }
+
+  throw new Error('Mapping stream ended unexpectedly');
+};
+
+export interface MergeJob {
+  job_id: string;
+  status: 'queued' | 'running' | 'cancelling' | 'succeeded' | 'failed' | 'cancelled';
+  stage: string | null;
+  step: number;
+  total_steps: number;
+  error: string | null;
+  output_dir: string;
+  files: string[];
+}
+
+const mergeJobRequest = async (path: string, method = 'GET'): Promise<MergeJob> => {
+  const response = await fetch(`${API_BASE_URL}/api/merge-jobs${path}`, { method });
+  const data = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    throw new Error(data.detail || data.error || `Merge job request failed with status ${response.status}`);
+  }
+  return data as MergeJob;
+};
+
+export const submitMergeJob = () => {
+  const userId = localStorage.getItem('userId') || '';
+  return mergeJobRequest(userId ? `?user_id=${encodeURIComponent(userId)}` : '', 'POST');
+};
+
+export const getMergeJob = (jobId: string) => mergeJobRequest(`/${jobId}`);
+
+export const cancelMergeJob = (jobId: string) => mergeJobRequest(`/${jobId}`, 'DELETE');
+
+// Polls a merge job until it finishes, reporting each state along the way
+export const waitForMergeJob = async (
+  jobId: string,
+  onProgress: (job: MergeJob) => void,
+  intervalMs = 1000
+): Promise<MergeJob> => {
+  while (true) {
+    const job = await getMergeJob(jobId);
+    onProgress(job);
+    if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+      return job;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
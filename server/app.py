@@ -1,33 +1,67 @@
-from schema_json import extract_schema_from_dir
+from schema_json import extract_schema_from_dir_async, schema_cache, shutdown_schema_executor
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
 import uvicorn
 from fastapi import UploadFile, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import uuid
 from fastapi import Form
 import pandas as pd
 import sys
 from pathlib import Path
-from gemini_service import generate_text
+from gemini_service import generate_text, stream_text, get_llm_stats
 from schema_detector import process_directory
-from script import BankDataMerger
+from merge_jobs import MergeJobManager
+from mapping_spec import MappingSpec, MappingSpecError
+from upload_store import UploadStore, UPLOAD_STORE_MAX_BYTES
 import uuid
 from fastapi import Form
 import re
 import json
+import asyncio
+from contextlib import asynccontextmanager
 
-from prompts import generate_relationship_prompt, generate_mapping_prompt
-from starlette.concurrency import run_in_threadpool
+from prompts import generate_database_relationship_prompts, generate_mapping_prompts
+from mapping_chunks import (
+    parse_mapping_response, split_target_tables, table_names, merge_mapping_documents,
+    MappingStreamParser, mapping_key, unique_mapping_id
+)
+from column_matcher import ColumnMatcher, local_mapping_document, mark_mapped_columns, candidate_hints
 # Add the server directory to the Python path
 sys.path.append(str(Path(__file__).parent))
 
+UPLOAD_BASE_DIR = "user_uploads"
+# Uploaded files are stored once by content hash; user directories link to them
+upload_store = UploadStore(UPLOAD_BASE_DIR, UPLOAD_STORE_MAX_BYTES)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Evict unreferenced upload blobs in the background
+    gc_task = asyncio.create_task(upload_store.run_garbage_collector())
+    yield
+    gc_task.cancel()
+    merge_jobs.shutdown()
+    shutdown_schema_executor()
+
 # Initialize FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
-UPLOAD_BASE_DIR = "user_uploads"
+# Parsed source tables reused across merges (see source_cache.py)
+SOURCE_CACHE_DIR = "source_cache"
+# Worker processes used to load source files during a merge (1 loads in-process)
+MERGE_LOAD_WORKERS = int(os.getenv("MERGE_LOAD_WORKERS", 1))
+# Threads running independent table tasks within a merge (1 runs them in order)
+MERGE_TASK_WORKERS = int(os.getenv("MERGE_TASK_WORKERS", 1))
+# Rows per chunk when streaming Bank1 transaction CSVs instead of loading them whole (0 disables)
+MERGE_STREAM_CHUNK_SIZE = int(os.getenv("MERGE_STREAM_CHUNK_SIZE", 0)) or None
+# Every merge job writes to its own directory under here
+MERGE_OUTPUT_DIR = os.getenv("MERGE_OUTPUT_DIR", "merge_outputs")
+merge_jobs = MergeJobManager(MERGE_OUTPUT_DIR, merger_options={
+    "cache_dir": SOURCE_CACHE_DIR, "load_workers": MERGE_LOAD_WORKERS, "merge_workers": MERGE_TASK_WORKERS,
+    "stream_chunk_size": MERGE_STREAM_CHUNK_SIZE
+})
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -48,11 +82,56 @@ async def root():
 # Create base upload directory if it doesn't exist
 os.makedirs(UPLOAD_BASE_DIR, exist_ok=True)
 
+def parses(parse, *args):
+    """Validator for LLM responses: whether parse(response, *args) accepts a response"""
+    def validate(response):
+        try:
+            parse(response, *args)
+        except ValueError:
+            return False
+        return True
+    return validate
+
+def parse_database_analysis(analysis, role):
+    """Parse the JSON answer to a relationship-analysis prompt"""
+    # Extract JSON from response
+    json_match = re.search(r'```(?:json)?\s*({[\s\S]*?})\s*```', analysis)
+    if json_match:
+        analysis = json.loads(json_match.group(1))
+    else:
+        try:
+            analysis = json.loads(analysis)
+        except json.JSONDecodeError:
+            raise ValueError(f"Failed to parse {role} schema analysis")
+    
+    # Tolerate the model wrapping its answer in the role key
+    if isinstance(analysis, dict) and set(analysis) == {role}:
+        analysis = analysis[role]
+    return analysis
+
+async def analyze_database(database_info, role, refresh=False):
+    """Ask the LLM for the keys and relationships of one database"""
+    # Large schemas are split by table to stay within the prompt token budget
+    schema_prompts = generate_database_relationship_prompts(database_info, role)
+    responses = await asyncio.gather(
+        *(generate_text(prompt, use_cache=not refresh, validate=parses(parse_database_analysis, role))
+          for prompt in schema_prompts)
+    )
+    analyses = [parse_database_analysis(response, role) for response in responses]
+    if len(analyses) == 1:
+        return analyses[0]
+    
+    tables = []
+    for analysis in analyses:
+        tables.extend(analysis.get("tables", []))
+    return {**analyses[0], "tables": tables}
+
 @app.post("/api/upload-files")
 async def upload_files(
     source_files: list[UploadFile] = File(default=[]),
     target_files: list[UploadFile] = File(default=[]),
-    user_id: str = Form(None)
+    user_id: str = Form(None),
+    refresh: bool = False
 ):
     
     try:
@@ -66,62 +145,24 @@ async def upload_files(
         user_dir = os.path.join(UPLOAD_BASE_DIR, user_id)
         source_dir = os.path.join(user_dir, "source")
         target_dir = os.path.join(user_dir, "target")
-
-        # if os.path.exists(user_dir):
-        #     import shutil
-        #     shutil.rmtree(user_dir)
-        
-        # Remove existing directories if they exist
-        if os.path.exists(user_dir):
-            import shutil
-            shutil.rmtree(user_dir)
-            
-        # Create fresh directories
-        os.makedirs(source_dir, exist_ok=True)
-        os.makedirs(target_dir, exist_ok=True)
         
         # Track errors
         errors = []
         
-        # Save source files
-        for file in source_files:
-            if not file.filename or not file.filename.strip():
-                continue
-                
-            file_path = os.path.join(source_dir, os.path.basename(file.filename))
-            
-            try:
-                contents = await file.read()
-                if not contents:
-                    raise ValueError("File is empty")
-                    
-                if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-                    with open(file_path, "wb") as buffer:
-                        buffer.write(contents)
-            except Exception as e:
-                error_msg = f"Error processing source file {file.filename}: {str(e)}"
-                print(error_msg)
-                errors.append(error_msg)
-        
-        # Save target files
-        for file in target_files:
-            if not file.filename or not file.filename.strip():
-                continue
-                
-            file_path = os.path.join(target_dir, os.path.basename(file.filename))
-            
-            try:
-                contents = await file.read()
-                if not contents:
-                    raise ValueError("File is empty")
+        # Store source and target files by content hash; unchanged files are only hashed
+        uploaded = {"source": {}, "target": {}}
+        for kind, files in (("source", source_files), ("target", target_files)):
+            for file in files:
+                if not file.filename or not file.filename.strip():
+                    continue
                     
-                if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-                    with open(file_path, "wb") as buffer:
-                        buffer.write(contents)
-            except Exception as e:
-                error_msg = f"Error processing target file {file.filename}: {str(e)}"
-                print(error_msg)
-                errors.append(error_msg)
+                try:
+                    stored = await upload_store.ingest(file)
+                    uploaded[kind][os.path.basename(file.filename)] = stored["sha256"]
+                except Exception as e:
+                    error_msg = f"Error processing {kind} file {file.filename}: {str(e)}"
+                    print(error_msg)
+                    errors.append(error_msg)
         
         # If there were any errors, return them immediately
         if errors:
@@ -130,24 +171,24 @@ async def upload_files(
                 content={"errors": errors}
             )
         
+        # Point the user's source/ and target/ directories at the stored files
+        await asyncio.to_thread(upload_store.update_manifest, user_id, uploaded)
+        
         # Process directories to get schema info
         try:
-            source_info = extract_schema_from_dir(source_dir)
-            target_info = extract_schema_from_dir(target_dir)
-            
-            schema_prompt = generate_relationship_prompt(source_info, target_info)
-            # Generate schema analysis
-            schema_analysis = await generate_text(schema_prompt)
+            # Both workbooks are parsed at once in worker processes, off the event loop
+            source_info, target_info = await asyncio.gather(
+                extract_schema_from_dir_async(source_dir),
+                extract_schema_from_dir_async(target_dir)
+            )
             
-            # Extract JSON from response
-            json_match = re.search(r'```(?:json)?\s*({[\s\S]*?})\s*```', schema_analysis)
-            if json_match:
-                schema_analysis = json.loads(json_match.group(1))
-            else:
-                try:
-                    schema_analysis = json.loads(schema_analysis)
-                except json.JSONDecodeError:
-                    raise ValueError("Failed to parse schema analysis")
+            # Source and target keys are independent, so analyze them concurrently;
+            # each side is cached on its own and a retry of one never redoes the other
+            source_analysis, target_analysis = await asyncio.gather(
+                analyze_database(source_info, "source", refresh),
+                analyze_database(target_info, "target", refresh)
+            )
+            schema_analysis = {"source": source_analysis, "target": target_analysis}
             
             return {"schema_analysis": schema_analysis}
             
@@ -166,36 +207,96 @@ async def upload_files(
         )
 
 
+@app.get("/api/cache-stats")
+async def cache_stats():
+    return {"schema": schema_cache.stats(), "llm": get_llm_stats()}
+
+def plan_mapping(schema_analysis, local_matching=True):
+    """
+    Settle obvious column pairs locally and split the rest into one model
+    request per target table.
+
+    Returns:
+        tuple: (local mapping document or None, [(target chunk, prompt), ...])
+    """
+    source_database = schema_analysis["source"]
+    target_database = schema_analysis["target"]
+    local_document = None
+    candidates = {}
+
+    if local_matching:
+        matches = ColumnMatcher(target_database).match(source_database)
+        if matches["accepted"]:
+            local_document = local_mapping_document(matches["accepted"])
+            print(f"Matched {len(matches['accepted'])} columns locally, "
+                  f"{len(matches['candidates'])} left for the model")
+            # Nothing left to ask the model about
+            if not matches["candidates"]:
+                return local_document, []
+            # Mapped columns stay in the prompt, compactly, as keys and context
+            source_database = mark_mapped_columns(source_database, {
+                (source.table, source.column): f"{target.table}.{target.column}"
+                for _, source, target in matches["accepted"]
+            })
+        candidates = matches["candidates"]
+
+    # One request per target table, and per part of a source schema too large
+    # for one prompt, run concurrently and merged afterwards
+    target_chunks = split_target_tables(target_database)
+    requests = []
+    for target_chunk in target_chunks:
+        focus_tables = table_names(target_chunk) if len(target_chunks) > 1 else None
+        hints = candidate_hints(candidates, focus_tables)
+        for mapping_prompt in generate_mapping_prompts(source_database, target_chunk, focus_tables, hints):
+            requests.append((target_chunk, mapping_prompt))
+    return local_document, requests
+
+# Model requests per target table before its mappings are given up on
+MAPPING_CHUNK_ATTEMPTS = 2
+
 @app.post("/api/generate-suggested-mapping")
-async def generate_suggested_mapping(schema_analysis: dict):
+async def generate_suggested_mapping(schema_analysis: dict, refresh: bool = False, local_matching: bool = True):
     try:
-        source_database = schema_analysis["source"]
-        target_database = schema_analysis["target"]
+        local_document, requests = plan_mapping(schema_analysis, local_matching)
+        target_chunks = [target_chunk for target_chunk, _ in requests]
 
-        mapping_prompt = generate_mapping_prompt(source_database, target_database)
+        async def generate_chunk(target_chunk, mapping_prompt):
+            focus_tables = table_names(target_chunk) if len(target_chunks) > 1 else None
+            use_cache = not refresh
+            for attempt in range(MAPPING_CHUNK_ATTEMPTS):
+                chunk_response = await generate_text(mapping_prompt, use_cache=use_cache,
+                                                     validate=parses(parse_mapping_response))
+                try:
+                    return parse_mapping_response(chunk_response)
+                except ValueError:
+                    if attempt == MAPPING_CHUNK_ATTEMPTS - 1:
+                        raise
+                    # Ask again rather than drop the table's mappings
+                    print(f"Retrying mapping for {', '.join(focus_tables or ['all tables'])}")
+                    use_cache = False
 
-        mapping_response = await generate_text(mapping_prompt)
-        
-        # Debug: Print the raw response from Gemini
-        print("=" * 80)
-        print("RAW GEMINI RESPONSE:")
-        print(mapping_response[:500])  # First 500 characters
-        print("=" * 80)
-
-        # Try to extract JSON from markdown code blocks first
-        json_match = re.search(r'```(?:json)?\s*(\{[\s\S]*?\})\s*```', mapping_response)
-        if json_match:
-            mapping_response = json_match.group(1)
-        
-        # Now parse the JSON
-        try:
-            mapping_response = json.loads(mapping_response)
-        except json.JSONDecodeError as e:
-            print(f"JSON Parse Error: {str(e)}")
-            print(f"Full response length: {len(mapping_response)} chars")
-            print(f"First 1000 chars of response:\n{mapping_response[:1000]}")
-            print(f"Last 500 chars of response:\n{mapping_response[-500:]}")
-            raise ValueError("Failed to parse mapping response")
+        results = await asyncio.gather(
+            *(generate_chunk(chunk, prompt) for chunk, prompt in requests), return_exceptions=True
+        )
+
+        documents = []
+        warnings = []
+        for target_chunk, result in zip(target_chunks, results):
+            if isinstance(result, Exception):
+                tables = ', '.join(table_names(target_chunk)) or 'all tables'
+                warnings.append(f"Mapping for {tables} failed: {str(result)}")
+                print(warnings[-1])
+            else:
+                documents.append(result)
+        if local_document:
+            documents.append(local_document)
+
+        if not documents:
+            raise ValueError("; ".join(warnings) or "Failed to parse mapping response")
+
+        mapping_response = merge_mapping_documents(documents)
+        if warnings:
+            return {"mapping_response": mapping_response, "warnings": warnings}
         
         return {"mapping_response": mapping_response}
     except Exception as e:
@@ -205,48 +306,216 @@ async def generate_suggested_mapping(schema_analysis: dict):
             content={"error": f"Suggested mapping generation failed: {str(e)}"}
         )
 
-# New endpoint to run the merge process and save outputs under DataWeave/output
+def sse_event(event, data):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/api/generate-suggested-mapping/stream")
+async def stream_suggested_mapping(schema_analysis: dict, refresh: bool = False, local_matching: bool = True):
+    """
+    Streaming variant of generate-suggested-mapping.
+
+    Sends a ``mapping`` event for every mapping object as soon as the model has
+    finished writing it, then a ``done`` event carrying the same merged document
+    the buffered endpoint returns, or an ``error`` event. Locally matched
+    columns are sent first.
+    """
+    local_document, requests = plan_mapping(schema_analysis, local_matching)
+    target_chunks = [target_chunk for target_chunk, _ in requests]
+
+    async def stream_chunk(index, mapping_prompt, events):
+        parser = MappingStreamParser()
+        parts = []
+        try:
+            async for text in stream_text(mapping_prompt, use_cache=not refresh,
+                                          validate=parses(parse_mapping_response)):
+                parts.append(text)
+                for mapping in parser.feed(text):
+                    await events.put(("mapping", index, mapping))
+            await events.put(("chunk", index, "".join(parts)))
+        except Exception as e:
+            await events.put(("failed", index, e))
+
+    async def event_stream():
+        events = asyncio.Queue()
+        tasks = [asyncio.create_task(stream_chunk(i, prompt, events))
+                 for i, (_, prompt) in enumerate(requests)]
+        streamed = [[] for _ in target_chunks]
+        documents = []
+        warnings = []
+        sent = set()
+        # Chunks number their mappings independently, so IDs are made unique across the stream
+        sent_ids = set()
+        try:
+            if local_document:
+                for mapping in local_document["mappings"]:
+                    sent.add(mapping_key(mapping))
+                    yield sse_event("mapping", {**mapping, "id": unique_mapping_id(mapping, sent_ids)})
+
+            for _ in target_chunks:
+                while True:
+                    kind, index, payload = await events.get()
+                    if kind != "mapping":
+                        break
+                    streamed[index].append(payload)
+                    key = mapping_key(payload)
+                    if key not in sent:
+                        sent.add(key)
+                        yield sse_event("mapping", {**payload, "id": unique_mapping_id(payload, sent_ids)})
+
+                tables = ', '.join(table_names(target_chunks[index])) or 'all tables'
+                if kind == "chunk":
+                    try:
+                        documents.append(parse_mapping_response(payload))
+                        continue
+                    except ValueError:
+                        # Keep whatever mappings were complete
+                        payload = ValueError("Failed to parse mapping response")
+                if streamed[index]:
+                    documents.append({"mappings": streamed[index]})
+                warnings.append(f"Mapping for {tables} failed: {str(payload)}")
+                print(warnings[-1])
+            if local_document:
+                documents.append(local_document)
+
+            if not documents:
+                raise ValueError("; ".join(warnings) or "Failed to parse mapping response")
+
+            result = {"mapping_response": merge_mapping_documents(documents)}
+            if warnings:
+                result["warnings"] = warnings
+            yield sse_event("done", result)
+        except Exception as e:
+            print(f"Error during suggested mapping streaming: {str(e)}")
+            yield sse_event("error", {"error": f"Suggested mapping generation failed: {str(e)}"})
+        finally:
+            # The client went away or everything finished
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def resolve_mapping_file(mapping_path=None):
+    """First existing mapping file among the requested and default locations"""
+    candidate_paths = []
+    if mapping_path:
+        candidate_paths.append(Path(mapping_path))
+    # Workspace root mapping_output.json (commonly used during development)
+    candidate_paths.append(Path("/Users/dhruvcharan/Downloads/Archive/mapping_output.json"))
+    # Server-local mapping.json fallback
+    candidate_paths.append(Path(__file__).parent / "mapping.json")
+
+    for p in candidate_paths:
+        if p and p.exists():
+            return str(p)
+    return None
+
+def validate_mapping_file(mapping_file):
+    """Raise MappingSpecError if the mapping file is not a valid mapping document"""
+    try:
+        with open(mapping_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except ValueError as e:
+        raise MappingSpecError([f"document: invalid JSON ({e})"])
+    MappingSpec(data)
+
+def submit_merge_job(mapping_path=None, user_id=None):
+    """Queue a merge of the default bank directories; None if there is no mapping file"""
+    mapping_file = resolve_mapping_file(mapping_path)
+    if not mapping_file:
+        return None
+    # A bad mapping is rejected here rather than failing the queued job
+    validate_mapping_file(mapping_file)
+
+    # Determine repository root: .../DataWeave
+    repo_root = Path(__file__).resolve().parents[2]
+    return merge_jobs.submit(mapping_file, str(repo_root / "Bank 1 Data"), str(repo_root / "Bank 2 Data"),
+                             user_id=user_id)
+
+MISSING_MAPPING_ERROR = "No mapping file found. Provide mapping_path or place mapping.json next to server."
+
+@app.post("/api/merge-jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_merge_job(mapping_path: str | None = None, user_id: str | None = None):
+    try:
+        job = submit_merge_job(mapping_path, user_id)
+    except MappingSpecError as e:
+        return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            content={"error": "Invalid mapping document", "details": e.errors})
+    if job is None:
+        return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"error": MISSING_MAPPING_ERROR})
+    return job.to_dict()
+
+@app.get("/api/merge-jobs")
+async def list_merge_jobs(user_id: str | None = None):
+    return {"jobs": [job.to_dict() for job in merge_jobs.list(user_id)]}
+
+@app.get("/api/merge-jobs/{job_id}")
+async def get_merge_job(job_id: str):
+    job = merge_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Merge job not found")
+    return job.to_dict()
+
+@app.get("/api/merge-jobs/{job_id}/events")
+async def merge_job_events(job_id: str):
+    """Server-sent ``progress`` events until the job finishes"""
+    if merge_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Merge job not found")
+
+    async def event_stream():
+        async for state in merge_jobs.watch(job_id):
+            yield sse_event("progress", state)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/merge-jobs/{job_id}/resume", status_code=status.HTTP_202_ACCEPTED)
+async def resume_merge_job(job_id: str):
+    """Queue a failed or cancelled merge job again, resuming from its checkpoint."""
+    job = merge_jobs.resume(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Merge job not found")
+    if job.status != 'queued':
+        raise HTTPException(status_code=409, detail=f"Only failed or cancelled jobs can be resumed (job is {job.status})")
+    return job.to_dict()
+
+
+@app.delete("/api/merge-jobs/{job_id}")
+async def cancel_merge_job(job_id: str):
+    job = merge_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Merge job not found")
+    return job.to_dict()
+
+# Runs a merge as a job and waits for it, for callers that expect the outputs in the response
 @app.post("/api/run-merge")
-async def run_merge(mapping_path: str | None = None):
+async def run_merge(mapping_path: str | None = None, user_id: str | None = None):
     try:
-        # Determine repository root: .../DataWeave
-        repo_root = Path(__file__).resolve().parents[2]
-
-        # Default directories
-        bank1_dir = str(repo_root / "Bank 1 Data")
-        bank2_dir = str(repo_root / "Bank 2 Data")
-        output_dir = str(repo_root / "output")
-
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Determine mapping file path
-        candidate_paths = []
-        if mapping_path:
-            candidate_paths.append(Path(mapping_path))
-        # Workspace root mapping_output.json (commonly used during development)
-        candidate_paths.append(Path("/Users/dhruvcharan/Downloads/Archive/mapping_output.json"))
-        # Server-local mapping.json fallback
-        candidate_paths.append(Path(__file__).parent / "mapping.json")
-
-        mapping_file = None
-        for p in candidate_paths:
-            if p and p.exists():
-                mapping_file = str(p)
-                break
-
-        if not mapping_file:
+        job = submit_merge_job(mapping_path, user_id)
+        if job is None:
             return JSONResponse(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                content={"error": "No mapping file found. Provide mapping_path or place mapping.json next to server."}
+                content={"error": MISSING_MAPPING_ERROR}
             )
 
-        merger = BankDataMerger(mapping_file, bank1_dir, bank2_dir, output_dir)
-        await run_in_threadpool(merger.run_merge)
+        job = await merge_jobs.wait(job.id)
+        if job.status != "succeeded":
+            raise RuntimeError(job.error or f"job {job.status}")
 
-        # List generated files
-        files = sorted(os.listdir(output_dir)) if os.path.isdir(output_dir) else []
-        return {"output_dir": output_dir, "files": files}
+        return {"job_id": job.id, "output_dir": job.output_dir, "files": job.files}
 
+    except MappingSpecError as e:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"error": "Invalid mapping document", "details": e.errors}
+        )
     except Exception as e:
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
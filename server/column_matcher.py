@@ -0,0 +1,328 @@
+import json
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from prompts import schema_tables, MAPPED_NOTE
+
+# A pair scoring at least this much, and clearly ahead of the runner-up, is
+# accepted without asking the model
+AUTO_ACCEPT_SCORE = 0.85
+AUTO_ACCEPT_MARGIN = 0.1
+
+# Weaker pairs are passed to the model as hints, at most this many per column
+CANDIDATE_MIN_SCORE = 0.35
+MAX_CANDIDATES = 3
+
+NGRAM_SIZE = 3
+
+# Weights of the name token, name n-gram and description scores
+NAME_WEIGHT = 0.5
+NGRAM_WEIGHT = 0.3
+DESCRIPTION_WEIGHT = 0.2
+# Share of the score that depends on the two table names matching
+TABLE_WEIGHT = 0.1
+
+# Words that carry no meaning in a column name or description
+STOPWORDS = {'a', 'an', 'the', 'of', 'for', 'to', 'in', 'on', 'and', 'or', 'is', 'by', 'with'}
+
+# Common abbreviations in banking schemas
+ABBREVIATIONS = {
+    'acct': 'account', 'acc': 'account', 'addr': 'address', 'amt': 'amount',
+    'bal': 'balance', 'cust': 'customer', 'dob': ['date', 'birth'], 'dt': 'date',
+    'no': 'number', 'num': 'number', 'nbr': 'number', 'ref': 'reference',
+    'tx': 'transaction', 'txn': 'transaction', 'trans': 'transaction',
+    'ccy': 'currency', 'curr': 'currency', 'tel': 'phone', 'mobile': 'phone',
+    'zip': 'postcode', 'postal': 'postcode', 'identifier': 'id', 'desc': 'description',
+}
+
+# Transforms of locally matched pairs, by word in either column name; the
+# first rule that applies wins and pairs matching none are mapped as-is
+TRANSFORM_RULES = [
+    ({'date'}, {"type": "parse_date", "params": {}}),
+    ({'phone'}, {"type": "custom", "params": {"rule": "Normalize phone number to E.164"}}),
+    ({'amount', 'balance'}, {"type": "cast", "params": {"type": "decimal", "precision": 15, "scale": 2}}),
+]
+
+_CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split camelCase, snake_case and free text into normalized word tokens."""
+    tokens = []
+    for word in _CAMEL_RE.findall(str(text)):
+        word = word.lower()
+        if word in STOPWORDS:
+            continue
+        expanded = ABBREVIATIONS.get(word, word)
+        for token in expanded if isinstance(expanded, list) else [expanded]:
+            # Plural table and column names match their singular form
+            if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+                token = token[:-1]
+            tokens.append(token)
+    return tokens
+
+
+def ngrams(tokens: List[str], size: int = NGRAM_SIZE) -> set:
+    text = f" {' '.join(tokens)} "
+    return {text[i:i + size] for i in range(max(len(text) - size + 1, 1))}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def dice(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def database_columns(database: Any) -> Dict[str, Dict[str, str]]:
+    """
+    Columns of a database description as ``{table: {column: description}}``.
+
+    Accepts the workbook layout from ``extract_schema_from_dir`` and the
+    ``{"database", "tables": [...]}`` layout of the schema analysis, whose
+    columns may be a dict, a list of names or a list of objects.
+    """
+    tables = schema_tables(database)
+    if tables is not None:
+        return tables
+
+    result = {}
+    if not isinstance(database, dict):
+        return result
+    for table in database.get('tables', []):
+        if not isinstance(table, dict) or not table.get('name'):
+            continue
+        columns = table.get('columns') or {}
+        if isinstance(columns, dict):
+            result[table['name']] = {str(k): v if isinstance(v, str) else '' for k, v in columns.items()}
+            continue
+        entries = {}
+        for column in columns if isinstance(columns, list) else []:
+            name = _column_name(column)
+            if not name:
+                continue
+            description = (column.get('description') or column.get('definition') or ''
+                           if isinstance(column, dict) else '')
+            entries[name] = description if isinstance(description, str) else ''
+        result[table['name']] = entries
+    return result
+
+
+class ColumnEntry:
+    """One indexed column with its precomputed features."""
+
+    __slots__ = ('table', 'column', 'table_tokens', 'name_tokens', 'qualified_tokens',
+                 'grams', 'qualified_grams', 'description_tokens')
+
+    def __init__(self, table: str, column: str, description: str):
+        self.table = table
+        self.column = column
+        table_tokens = tokenize(table)
+        name_tokens = tokenize(column)
+        self.table_tokens = set(table_tokens)
+        self.name_tokens = set(name_tokens)
+        # "id" in table "Customers" reads as "customer id"
+        self.qualified_tokens = self.name_tokens | self.table_tokens
+        self.grams = ngrams(name_tokens)
+        self.qualified_grams = ngrams([t for t in table_tokens if t not in self.name_tokens] + name_tokens)
+        self.description_tokens = set(tokenize(description)) if description else set()
+
+
+class ColumnMatcher:
+    """
+    Inverted index of target columns by name token and character n-gram.
+
+    Source columns are looked up against the index instead of being compared
+    with every target column, then scored on name tokens, name n-grams and
+    description words.
+    """
+
+    def __init__(self, target_database: Any):
+        self.entries = []
+        self.index = defaultdict(set)
+        for table, columns in database_columns(target_database).items():
+            for column, description in columns.items():
+                entry = ColumnEntry(table, column, description)
+                position = len(self.entries)
+                self.entries.append(entry)
+                for key in entry.qualified_tokens:
+                    self.index[('token', key)].add(position)
+                for gram in entry.grams:
+                    self.index[('gram', gram)].add(position)
+
+    @staticmethod
+    def score(source: ColumnEntry, target: ColumnEntry) -> float:
+        name_score = max(jaccard(source.name_tokens, target.name_tokens),
+                         0.95 * jaccard(source.qualified_tokens, target.qualified_tokens))
+        gram_score = max(dice(source.grams, target.grams),
+                         0.95 * dice(source.qualified_grams, target.qualified_grams))
+        score = NAME_WEIGHT * name_score + NGRAM_WEIGHT * gram_score
+        if source.description_tokens and target.description_tokens:
+            score += DESCRIPTION_WEIGHT * jaccard(source.description_tokens, target.description_tokens)
+        else:
+            score /= NAME_WEIGHT + NGRAM_WEIGHT
+        # The same column name in an unrelated table is a weaker match
+        return score * (1 - TABLE_WEIGHT + TABLE_WEIGHT * jaccard(source.table_tokens, target.table_tokens))
+
+    def candidates(self, source: ColumnEntry, limit: int = MAX_CANDIDATES) -> List[Tuple[float, ColumnEntry]]:
+        """Best scoring target columns for a source column, highest first."""
+        positions = set()
+        for key in source.qualified_tokens:
+            positions |= self.index.get(('token', key), set())
+        for gram in source.grams:
+            positions |= self.index.get(('gram', gram), set())
+        scored = [(self.score(source, self.entries[p]), self.entries[p]) for p in positions]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+    def match(self, source_database: Any) -> Dict[str, Any]:
+        """
+        Match every source column against the index.
+
+        Returns:
+            dict: ``accepted`` confident one-to-one pairs as
+            ``(score, source_entry, target_entry)``, ``candidates`` the
+            remaining source columns with their best targets as
+            ``{(table, column): [(score, target_entry), ...]}``
+        """
+        ranked = {}
+        for table, columns in database_columns(source_database).items():
+            for column, description in columns.items():
+                source = ColumnEntry(table, column, description)
+                ranked[(table, column)] = (source, self.candidates(source))
+
+        # Confident pairs, best first, each target column used once
+        proposals = []
+        for source, scored in ranked.values():
+            if not scored:
+                continue
+            best_score, best = scored[0]
+            runner_up = scored[1][0] if len(scored) > 1 else 0.0
+            if best_score >= AUTO_ACCEPT_SCORE and best_score - runner_up >= AUTO_ACCEPT_MARGIN:
+                proposals.append((best_score, source, best))
+        proposals.sort(key=lambda item: item[0], reverse=True)
+
+        accepted = []
+        used_targets = set()
+        accepted_sources = set()
+        for score, source, target in proposals:
+            if (target.table, target.column) in used_targets:
+                continue
+            used_targets.add((target.table, target.column))
+            accepted_sources.add((source.table, source.column))
+            accepted.append((score, source, target))
+
+        candidates = {
+            key: [(score, target) for score, target in scored if score >= CANDIDATE_MIN_SCORE]
+            for key, (source, scored) in ranked.items() if key not in accepted_sources
+        }
+        return {'accepted': accepted, 'candidates': candidates}
+
+
+def infer_transform(source: ColumnEntry, target: ColumnEntry) -> Dict[str, Any]:
+    """Transform a locally matched pair needs, from the words in its column names."""
+    tokens = source.name_tokens | target.name_tokens
+    for words, transform in TRANSFORM_RULES:
+        if tokens & words:
+            return {"type": transform["type"], "params": dict(transform["params"])}
+    return {"type": "identity", "params": {}}
+
+
+def local_mapping_document(accepted: List[Tuple[float, ColumnEntry, ColumnEntry]]) -> Dict[str, Any]:
+    """Express locally accepted pairs as a ``mapping-2.0`` document."""
+    mappings = []
+    for score, source, target in accepted:
+        mappings.append({
+            "id": f"local:{source.table}.{source.column}->{target.table}.{target.column}",
+            "domain": target.table.lower(),
+            "source": {"table": source.table, "column": source.column},
+            "target": {"table": target.table, "column": target.column},
+            "transform": infer_transform(source, target),
+            "confidence": round(score, 2),
+            "rationale": "Matched locally on column name and description similarity",
+            "status": "suggested"
+        })
+    return {
+        "version": "mapping-2.0",
+        "model": "local-matcher",
+        "source_dataset": {"name": "DatasetA"},
+        "target_dataset": {"name": "DatasetB"},
+        "mappings": mappings
+    }
+
+
+def _column_name(column: Any) -> Optional[str]:
+    if isinstance(column, dict):
+        column = column.get('name') or column.get('column')
+    return str(column) if column is not None else None
+
+
+def mark_mapped_columns(database: Any, mapped: Dict[Tuple[str, str], str]) -> Any:
+    """
+    Replace the description of every locally mapped column with a compact
+    ``already mapped → table.column`` note.
+
+    The columns stay in the schema so the model can still use them as link
+    and join keys and as context for the remaining columns.
+
+    Args:
+        database: Source schema, in either layout ``database_columns`` accepts
+        mapped: ``{(table, column): "target_table.target_column"}``
+    """
+    def note(table, column):
+        return f"{MAPPED_NOTE} {mapped[(table, column)]}"
+
+    if schema_tables(database) is not None:
+        if isinstance(database, str):
+            database = json.loads(database)
+        tables = {}
+        for name, table in database["Tables"].items():
+            columns = (table.get("Table Columns") or {}) if isinstance(table, dict) else {}
+            if any((name, column) in mapped for column in columns):
+                columns = {column: note(name, column) if (name, column) in mapped else description
+                           for column, description in columns.items()}
+                table = {**table, "Table Columns": columns}
+            tables[name] = table
+        return {**database, "Tables": tables}
+
+    if not isinstance(database, dict) or not isinstance(database.get('tables'), list):
+        return database
+
+    tables = []
+    for table in database['tables']:
+        if not isinstance(table, dict):
+            tables.append(table)
+            continue
+        name = table.get('name')
+        columns = table.get('columns')
+        if isinstance(columns, dict):
+            columns = {k: note(name, str(k)) if (name, str(k)) in mapped else v for k, v in columns.items()}
+        elif isinstance(columns, list):
+            columns = [{"name": _column_name(c), "description": note(name, _column_name(c))}
+                       if (name, _column_name(c)) in mapped else c for c in columns]
+        tables.append({**table, 'columns': columns} if columns is not None else table)
+    return {**database, 'tables': tables}
+
+
+def candidate_hints(candidates: Dict[Tuple[str, str], List[Tuple[float, ColumnEntry]]],
+                    target_tables: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Candidate targets per unresolved source column, for the mapping prompt.
+
+    Args:
+        candidates: ``candidates`` from ``ColumnMatcher.match``
+        target_tables: Only suggest columns of these target tables
+    """
+    hints = {}
+    for (table, column), scored in candidates.items():
+        targets = [f"{target.table}.{target.column} ({score:.2f})" for score, target in scored
+                   if target_tables is None or target.table in target_tables]
+        if targets:
+            hints[f"{table}.{column}"] = targets
+    return hints
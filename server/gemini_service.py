@@ -1,6 +1,14 @@
 import os
-from typing import Optional
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from collections import deque
+from typing import Callable, Optional
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from dotenv import load_dotenv
 import asyncio
 
@@ -10,13 +18,313 @@ load_dotenv()
 # Configure the API key
 genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
 
-async def generate_text(prompt: str, model: str = "gemini-2.0-flash-exp") -> str:
-    """Generate text using the Gemini model."""
-    generative_model = genai.GenerativeModel(model)
-    
+# Response cache settings
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'llm_cache.sqlite3')
+LLM_CACHE_TTL_SECONDS = int(os.getenv('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+
+# Request limits: concurrent in-flight calls, per-attempt timeout and retries
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 4))
+LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', 120))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))
+LLM_RETRY_BASE_SECONDS = 1.0
+
+# Transient failures worth retrying
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+# Number of recent calls kept for latency reporting
+RECENT_CALLS = 100
+
+# Timestamps (e.g. the generated_at stamp in mapping prompts) do not change the answer
+_TIMESTAMP_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z?')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def cache_key(prompt: str, model: str) -> str:
+    """Hash the model name plus a whitespace- and timestamp-normalized prompt."""
+    normalized = _WHITESPACE_RE.sub(' ', _TIMESTAMP_RE.sub('<timestamp>', prompt)).strip()
+    return hashlib.sha256(f"{model}\n{normalized}".encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LLM response cache with TTL and size-based eviction."""
+
+    def __init__(self, path: str, ttl_seconds: int, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+                " size INTEGER, created_at REAL, last_access REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode('utf-8'))
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used responses go first
+        for key, size in conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> dict:
+        with self.lock, self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"entries": entries, "bytes": total, "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds}
+
+
+response_cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES)
+
+_call_stats = {"hits": 0, "misses": 0, "bypassed": 0, "coalesced": 0, "retries": 0, "timeouts": 0}
+_recent_calls = deque(maxlen=RECENT_CALLS)
+
+# One long-lived client per model name
+_models = {}
+
+# Bounds the number of blocking Gemini calls running in worker threads
+_request_slots = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Requests currently in flight by cache key, shared by identical concurrent prompts
+_in_flight = {}
+
+
+def get_model(model: str) -> genai.GenerativeModel:
+    """Return the shared client for a model, creating it on first use."""
+    if model not in _models:
+        _models[model] = genai.GenerativeModel(model)
+    return _models[model]
+
+
+def _record_call(model: str, source: str, started: float) -> None:
+    _call_stats[source] += 1
+    _recent_calls.append({
+        "model": model,
+        "source": source,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "at": time.time()
+    })
+
+
+def get_llm_stats() -> dict:
+    """Cache counters, cache size and latency of recent calls."""
+    calls = list(_recent_calls)
+    latency = {}
+    for source in ("hits", "misses", "bypassed", "coalesced"):
+        timings = [c["latency_ms"] for c in calls if c["source"] == source]
+        if timings:
+            latency[source] = {"count": len(timings), "avg_ms": round(sum(timings) / len(timings), 2),
+                               "max_ms": max(timings)}
+    lookups = _call_stats["hits"] + _call_stats["misses"]
+    return {
+        **_call_stats,
+        "in_flight": len(_in_flight),
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "hit_rate": _call_stats["hits"] / lookups if lookups else 0.0,
+        "cache": response_cache.stats(),
+        "latency": latency,
+        "recent_calls": calls[-10:]
+    }
+
+
+async def _request(prompt: str, model: str) -> str:
+    """Send one prompt to Gemini, bounded by the concurrency limit, with timeouts and jittered retries."""
+    generative_model = get_model(model)
+
     # Run the blocking call in a thread pool
     def _generate_sync():
-        response = generative_model.generate_content(prompt)
+        response = generative_model.generate_content(
+            prompt, request_options={"timeout": LLM_TIMEOUT_SECONDS}
+        )
         return response.text
-    
-    return await asyncio.to_thread(_generate_sync)
\ No newline at end of file
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        try:
+            # The SDK enforces the timeout; a worker thread cannot be interrupted,
+            # so its slot is only released once the call itself has returned
+            await _request_slots.acquire()
+            call = asyncio.ensure_future(asyncio.to_thread(_generate_sync))
+            call.add_done_callback(lambda _: _request_slots.release())
+            return await asyncio.shield(call)
+        except RETRYABLE_ERRORS as e:
+            if isinstance(e, (asyncio.TimeoutError, google_exceptions.DeadlineExceeded)):
+                _call_stats["timeouts"] += 1
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            _call_stats["retries"] += 1
+            # Full jitter keeps retries from many requests from lining up
+            delay = random.uniform(0, LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+            print(f"Gemini request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def generate_text(prompt: str, model: str = "gemini-2.0-flash-exp", use_cache: bool = True,
+                        validate: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    Generate text using the Gemini model.
+
+    Responses are cached by model and normalized prompt. Pass use_cache=False to
+    skip the lookup and force a fresh request; its response still refreshes the cache.
+    Responses failing validate, if given, are returned but not cached.
+    Identical prompts sent while a request is in flight share that request.
+    """
+    started = time.perf_counter()
+    key = cache_key(prompt, model)
+
+    if use_cache:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            _record_call(model, "hits", started)
+            return cached
+
+    task = _in_flight.get(key)
+    if task is not None:
+        # Shielded so one caller giving up does not cancel the shared request
+        text = await asyncio.shield(task)
+        _record_call(model, "coalesced", started)
+        return text
+
+    async def _fetch():
+        text = await _request(prompt, model)
+        if validate is None or validate(text):
+            await asyncio.to_thread(response_cache.put, key, model, text)
+        return text
+
+    task = asyncio.ensure_future(_fetch())
+    _in_flight[key] = task
+    task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    text = await asyncio.shield(task)
+    _record_call(model, "misses" if use_cache else "bypassed", started)
+    return text
+
+
+def _close_stream(response) -> None:
+    """Cancel the HTTP/gRPC stream behind a streamed response, where the SDK exposes it"""
+    iterator = getattr(response, "_iterator", None)
+    for method in ("cancel", "close"):
+        if callable(getattr(iterator, method, None)):
+            try:
+                getattr(iterator, method)()
+            except Exception:
+                pass
+            return
+
+
+async def stream_text(prompt: str, model: str = "gemini-2.0-flash-exp", use_cache: bool = True,
+                      validate: Optional[Callable[[str], bool]] = None):
+    """
+    Stream text from the Gemini model as it is generated.
+
+    Yields text fragments. A cached response is yielded whole; a streamed
+    response is stored in the cache once it completes, unless it fails validate.
+    """
+    started = time.perf_counter()
+    key = cache_key(prompt, model)
+
+    if use_cache:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            _record_call(model, "hits", started)
+            yield cached
+            return
+
+    generative_model = get_model(model)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done = object()
+
+    # Set when the consumer stops early, e.g. a client disconnecting mid-stream
+    stop = threading.Event()
+    stream = {}
+
+    # The blocking stream is consumed in a worker thread and handed to the loop
+    def _stream_sync():
+        try:
+            response = generative_model.generate_content(
+                prompt, stream=True, request_options={"timeout": LLM_TIMEOUT_SECONDS}
+            )
+            stream["response"] = response
+            for chunk in response:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+        except Exception as e:
+            if not stop.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            if stop.is_set():
+                _close_stream(stream.get("response"))
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    parts = []
+    # Held until the worker thread finishes; a stopped worker finishes at its next chunk
+    await _request_slots.acquire()
+    worker = asyncio.ensure_future(asyncio.to_thread(_stream_sync))
+    worker.add_done_callback(lambda _: _request_slots.release())
+    finished = False
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            parts.append(item)
+            yield item
+        await worker
+        finished = True
+    finally:
+        if not finished:
+            stop.set()
+            # Unblocks a worker waiting on the network for its next chunk
+            _close_stream(stream.get("response"))
+
+    text = "".join(parts)
+    if validate is None or validate(text):
+        await asyncio.to_thread(response_cache.put, key, model, text)
+    _record_call(model, "misses" if use_cache else "bypassed", started)
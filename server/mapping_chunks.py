@@ -0,0 +1,202 @@
+import json
+import re
+from typing import Any, Dict, List
+
+
+def parse_mapping_response(mapping_response: str) -> Dict[str, Any]:
+    """
+    Parse a mapping JSON document out of a raw model response.
+
+    Raises:
+        ValueError: If the response does not contain valid JSON
+    """
+    # Try to extract JSON from markdown code blocks first
+    json_match = re.search(r'```(?:json)?\s*(\{[\s\S]*?\})\s*```', mapping_response)
+    if json_match:
+        mapping_response = json_match.group(1)
+
+    # Now parse the JSON
+    try:
+        return json.loads(mapping_response)
+    except json.JSONDecodeError as e:
+        print(f"JSON Parse Error: {str(e)}")
+        print(f"Full response length: {len(mapping_response)} chars")
+        print(f"First 1000 chars of response:\n{mapping_response[:1000]}")
+        print(f"Last 500 chars of response:\n{mapping_response[-500:]}")
+        raise ValueError("Failed to parse mapping response")
+
+
+def split_target_tables(target_database: Any) -> List[Any]:
+    """
+    Split a target database description into one description per table.
+
+    Args:
+        target_database: The ``target`` entry of the schema analysis
+            (``{"database": ..., "tables": [...]}``)
+
+    Returns:
+        list: One database description per target table, or the original
+        description alone if it has fewer than two tables or an unknown shape
+    """
+    if isinstance(target_database, str):
+        try:
+            target_database = json.loads(target_database)
+        except json.JSONDecodeError:
+            return [target_database]
+
+    tables = target_database.get('tables') if isinstance(target_database, dict) else None
+    if not isinstance(tables, list) or len(tables) < 2:
+        return [target_database]
+
+    return [{**target_database, 'tables': [table]} for table in tables]
+
+
+def table_names(database: Any) -> List[str]:
+    """Names of the tables in a database description."""
+    if not isinstance(database, dict):
+        return []
+    return [t.get('name') for t in database.get('tables', []) if isinstance(t, dict) and t.get('name')]
+
+
+def mapping_key(mapping: Dict[str, Any]) -> tuple:
+    """(source table, source column, target table, target column) of a mapping."""
+    source = mapping.get('source') or {}
+    target = mapping.get('target') or {}
+    return (source.get('table'), source.get('column'), target.get('table'), target.get('column'))
+
+
+def unique_mapping_id(mapping: Dict[str, Any], seen_ids: set) -> str:
+    """
+    The mapping's ID, or one derived from its columns, with a ``_2``, ``_3``...
+    suffix if already in ``seen_ids``. The returned ID is added to ``seen_ids``.
+    """
+    key = mapping_key(mapping)
+    mapping_id = mapping.get('id') or f"{key[0]}.{key[1]}->{key[2]}.{key[3]}"
+    unique_id, suffix = mapping_id, 2
+    while unique_id in seen_ids:
+        unique_id = f"{mapping_id}_{suffix}"
+        suffix += 1
+    seen_ids.add(unique_id)
+    return unique_id
+
+
+def merge_mapping_documents(documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge the mapping documents produced for separate target tables into one
+    ``mapping-2.0`` document.
+
+    Mappings are de-duplicated on (source table, source column, target table,
+    target column), keeping the one with the highest confidence. A source column
+    that got a direct mapping in one chunk is not also kept as an extras-table
+    field from another chunk. Mapping IDs are made unique.
+    """
+    if not documents:
+        raise ValueError("No mapping documents to merge")
+
+    merged = {key: value for key, value in documents[0].items()
+              if key not in ('mappings', 'applied_transformations')}
+
+    best = {}
+    for document in documents:
+        for mapping in document.get('mappings', []):
+            key = mapping_key(mapping)
+            current = best.get(key)
+            if current is None or (mapping.get('confidence') or 0) > (current.get('confidence') or 0):
+                best[key] = mapping
+
+    # Source columns with a direct (non-extras) mapping somewhere
+    directly_mapped = {
+        key[:2] for key, mapping in best.items()
+        if (mapping.get('extra_field_handling') or {}).get('method') != 'extras_table'
+    }
+
+    mappings = []
+    seen_ids = set()
+    for key, mapping in best.items():
+        handling = mapping.get('extra_field_handling') or {}
+        if handling.get('method') == 'extras_table' and key[:2] in directly_mapped:
+            continue
+
+        mappings.append({**mapping, 'id': unique_mapping_id(mapping, seen_ids)})
+
+    merged['mappings'] = mappings
+
+    transformations = []
+    seen_transformations = set()
+    for document in documents:
+        for transform in document.get('applied_transformations', []):
+            marker = json.dumps(transform, sort_keys=True)
+            if marker not in seen_transformations:
+                seen_transformations.add(marker)
+                transformations.append(transform)
+    if transformations:
+        merged['applied_transformations'] = transformations
+
+    return merged
+
+
+class MappingStreamParser:
+    """
+    Incrementally pull complete mapping objects out of a streamed response.
+
+    Feed the response text as it arrives; each call returns the entries of the
+    top-level ``"mappings"`` array that have been completed since the last call.
+    The surrounding document (code fences, other keys) is skipped, so the full
+    response still has to go through ``parse_mapping_response`` at the end.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self.buffer += text
+        completed = []
+
+        if not self.in_array and not self.finished:
+            match = re.search(r'"mappings"\s*:\s*\[', self.buffer)
+            if not match:
+                return completed
+            self.in_array = True
+            self.pos = match.end()
+
+        buffer = self.buffer
+        while self.in_array and self.pos < len(buffer):
+            char = buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0 and char == '{':
+                    self.object_start = self.pos
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0:
+                    # End of the mappings array
+                    self.in_array = False
+                    self.finished = True
+                else:
+                    self.depth -= 1
+                    if self.depth == 0 and self.object_start is not None:
+                        try:
+                            mapping = json.loads(buffer[self.object_start:self.pos + 1])
+                        except json.JSONDecodeError:
+                            mapping = None
+                        if isinstance(mapping, dict):
+                            completed.append(mapping)
+                        self.object_start = None
+            self.pos += 1
+
+        return completed
@@ -0,0 +1,231 @@
+import json
+from collections import defaultdict
+
+from merge_join import JOIN_TYPES
+
+# Transform types the mapping prompt allows; the merger leaves parse_datetime and
+# currency_normalize values unchanged
+TRANSFORM_TYPES = {'identity', 'cast', 'parse_date', 'parse_datetime', 'string_normalize',
+                   'currency_normalize', 'custom'}
+
+# Errors listed in a MappingSpecError message; the rest are counted
+MAX_REPORTED_ERRORS = 20
+
+
+class MappingSpecError(ValueError):
+    """Raised when a mapping document does not match the mapping schema"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        shown = errors[:MAX_REPORTED_ERRORS]
+        more = f"\n  ... and {len(errors) - len(shown)} more" if len(errors) > len(shown) else ""
+        super().__init__(f"Invalid mapping document ({len(errors)} errors):\n  " + "\n  ".join(shown) + more)
+
+
+class CompiledTransform:
+    """A mapping transform with its column function resolved once"""
+
+    __slots__ = ('type', 'params', 'key', 'apply')
+
+    def __init__(self, transform_type, params, apply):
+        self.type = transform_type
+        self.params = params
+        # Shared by every column using the same transform, e.g. as a memo key
+        self.key = json.dumps({'type': transform_type, 'params': params}, sort_keys=True, default=str)
+        # apply(values, column_label) -> transformed Series, or None for a no-op
+        self.apply = apply
+
+
+def _is_text(value):
+    return isinstance(value, str) and value != ''
+
+
+def _check_column_ref(errors, where, ref):
+    if not isinstance(ref, dict):
+        errors.append(f"{where}: expected an object with table and column")
+        return
+    for field in ('table', 'column'):
+        if not _is_text(ref.get(field)):
+            errors.append(f"{where}.{field}: expected a non-empty string")
+
+
+def extras_handling(mapping):
+    """
+    The extra_field_handling of a mapping that goes to an extras table.
+
+    Only ``extras_table`` handling with a target table moves a column into an
+    extras table; the link key is optional. Other methods, such as
+    ``extend_table``, and handling without a target table leave the mapping as
+    a plain column mapping.
+
+    Returns:
+        dict: The handling, or None
+    """
+    handling = mapping.get('extra_field_handling')
+    if (isinstance(handling, dict) and handling.get('method') == 'extras_table'
+            and _is_text(handling.get('target_table'))):
+        return handling
+    return None
+
+
+def _check_key_list(errors, where, keys):
+    if not isinstance(keys, list) or not all(_is_text(key) for key in keys):
+        errors.append(f"{where}: expected a list of column names")
+        return False
+    return True
+
+
+class MappingSpec:
+    """
+    A validated mapping document with its lookups precomputed.
+
+    Mappings are indexed by ID, target table and source table, keeping their
+    document order, and mappings with ``extras_table`` handling are grouped by
+    extras table. When a
+    ``resolve_transform(type, params)`` function is given, every mapping's
+    transform is compiled to a ``CompiledTransform`` up front.
+
+    Raises:
+        MappingSpecError: With every schema problem found, before any data is read
+    """
+
+    def __init__(self, data, resolve_transform=None):
+        errors = []
+        if not isinstance(data, dict):
+            raise MappingSpecError(["document: expected a JSON object"])
+        self.data = data
+
+        mappings = data.get('mappings', [])
+        if not isinstance(mappings, list):
+            errors.append("mappings: expected a list")
+            mappings = []
+
+        self.mappings = []
+        self.positions = {}
+        self.by_target_table = defaultdict(list)
+        self.by_source_table = defaultdict(list)
+        self.extras_by_table = defaultdict(list)
+        self.transforms = {}
+
+        for index, mapping in enumerate(mappings):
+            where = f"mappings[{index}]"
+            if not isinstance(mapping, dict):
+                errors.append(f"{where}: expected an object")
+                continue
+            mapping_id = mapping.get('id')
+            if not _is_text(mapping_id):
+                errors.append(f"{where}.id: expected a non-empty string")
+                continue
+            where = f"mapping '{mapping_id}'"
+            if mapping_id in self.positions:
+                errors.append(f"{where}: duplicate id")
+                continue
+
+            problems = len(errors)
+            _check_column_ref(errors, f"{where}.source", mapping.get('source'))
+            _check_column_ref(errors, f"{where}.target", mapping.get('target'))
+            transform = mapping.get('transform')
+            if not isinstance(transform, dict):
+                errors.append(f"{where}.transform: expected an object")
+            else:
+                if transform.get('type', 'identity') not in TRANSFORM_TYPES:
+                    errors.append(f"{where}.transform.type: unknown type '{transform.get('type')}', "
+                                  f"expected one of {', '.join(sorted(TRANSFORM_TYPES))}")
+                if not isinstance(transform.get('params') or {}, dict):
+                    errors.append(f"{where}.transform.params: expected an object")
+            handling = mapping.get('extra_field_handling')
+            if handling:
+                if not isinstance(handling, dict):
+                    errors.append(f"{where}.extra_field_handling: expected an object")
+                else:
+                    for field in ('target_table', 'link_key'):
+                        if handling.get(field) and not isinstance(handling[field], str):
+                            errors.append(f"{where}.extra_field_handling.{field}: expected a string")
+            if len(errors) > problems:
+                continue
+
+            self.positions[mapping_id] = len(self.mappings)
+            self.mappings.append(mapping)
+            self.by_target_table[mapping['target']['table']].append(mapping)
+            self.by_source_table[mapping['source']['table']].append(mapping)
+            if extras_handling(mapping):
+                self.extras_by_table[handling['target_table']].append(mapping)
+            if resolve_transform is not None:
+                transform_type = transform.get('type', 'identity')
+                params = transform.get('params') or {}
+                self.transforms[mapping_id] = CompiledTransform(
+                    transform_type, params, resolve_transform(transform_type, params))
+
+        self.output_plans = data.get('output_plans')
+        if self.output_plans is not None:
+            self._check_output_plans(errors)
+
+        if errors:
+            raise MappingSpecError(errors)
+
+    def _check_output_plans(self, errors):
+        if not isinstance(self.output_plans, list):
+            errors.append("output_plans: expected a list")
+            return
+        for index, plan in enumerate(self.output_plans):
+            where = f"output_plans[{index}]"
+            if not isinstance(plan, dict):
+                errors.append(f"{where}: expected an object")
+                continue
+            if not _is_text(plan.get('output_table')):
+                errors.append(f"{where}.output_table: expected a non-empty string")
+            else:
+                where = f"output plan '{plan['output_table']}'"
+
+            join = plan.get('join')
+            if not isinstance(join, dict):
+                errors.append(f"{where}.join: expected an object")
+            else:
+                if join.get('type') not in JOIN_TYPES:
+                    errors.append(f"{where}.join.type: unknown type '{join.get('type')}', "
+                                  f"expected one of {', '.join(JOIN_TYPES)}")
+                key_counts = []
+                for side in ('left', 'right'):
+                    config = join.get(side)
+                    if not isinstance(config, dict) or not _is_text(config.get('table')):
+                        errors.append(f"{where}.join.{side}: expected an object with table and on")
+                    elif _check_key_list(errors, f"{where}.join.{side}.on", config.get('on')):
+                        key_counts.append(len(config['on']))
+                if len(key_counts) == 2 and key_counts[0] != key_counts[1]:
+                    errors.append(f"{where}.join: left.on and right.on have different numbers of keys")
+
+            dedupe = plan.get('dedupe')
+            if dedupe is not None:
+                if not isinstance(dedupe, dict):
+                    errors.append(f"{where}.dedupe: expected an object")
+                elif 'keys' in dedupe:
+                    _check_key_list(errors, f"{where}.dedupe.keys", dedupe['keys'])
+
+            use_mappings = plan.get('use_mappings', [])
+            if not isinstance(use_mappings, list):
+                errors.append(f"{where}.use_mappings: expected a list of mapping ids")
+                continue
+            for mapping_id in use_mappings:
+                if mapping_id not in self.positions:
+                    errors.append(f"{where}.use_mappings: unknown mapping id '{mapping_id}'")
+
+    def for_target_table(self, table):
+        """Mappings into a target table, in document order"""
+        return self.by_target_table.get(table, [])
+
+    def for_source_table(self, table):
+        """Mappings from a source table, in document order"""
+        return self.by_source_table.get(table, [])
+
+    def get(self, mapping_id):
+        position = self.positions.get(mapping_id)
+        return self.mappings[position] if position is not None else None
+
+    def select(self, mapping_ids):
+        """Mappings with the given IDs, in document order"""
+        positions = sorted({self.positions[i] for i in mapping_ids if i in self.positions})
+        return [self.mappings[position] for position in positions]
+
+    def transform(self, mapping):
+        """Compiled transform of a mapping"""
+        return self.transforms[mapping['id']]
@@ -0,0 +1,200 @@
+import json
+import os
+import shutil
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - checkpointing is simply disabled without pyarrow
+    feather = None
+
+CHECKPOINT_DIR_NAME = ".merge_checkpoint"
+CHECKPOINT_MANIFEST_NAME = "manifest.json"
+
+
+class MergeCheckpoint:
+    """
+    Checkpoints of a merge run, kept in a run directory next to its outputs.
+
+    After each merge task finishes, the tables it wrote are stored as
+    uncompressed Arrow (Feather) files, or as pickles when Arrow rejects a
+    frame, and the task is recorded as completed in the manifest, together
+    with its duration and the wall-clock span of every stage in each attempt
+    at the run.
+    A run started again with the same run key skips the completed tasks and
+    restores their tables; a different run key (changed inputs, mappings or
+    settings) discards the checkpoint.
+    """
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.enabled = feather is not None
+        self.lock = threading.Lock()
+        self.manifest = None
+
+    def _manifest_path(self):
+        return os.path.join(self.run_dir, CHECKPOINT_MANIFEST_NAME)
+
+    def _table_path(self, table, extension='.arrow'):
+        clean_name = table.replace(' ', '_').replace('/', '_')
+        return os.path.join(self.run_dir, f"{clean_name}{extension}")
+
+    def _write_table(self, table, df):
+        """
+        Store one table, as Feather when Arrow accepts it and as a pickle otherwise.
+
+        Arrow rejects object columns holding mixed types (e.g. ints and strings
+        from a loosely typed source column) and non-string column names; the
+        pickle keeps such frames exactly as they were.
+
+        Returns:
+            str: File name of the stored table inside the run directory
+        """
+        for extension in ('.arrow', '.pkl'):
+            data_path = self._table_path(table, extension)
+            tmp_path = f"{data_path}.{threading.get_ident()}.tmp"
+            try:
+                if extension == '.arrow':
+                    feather.write_feather(df, tmp_path, compression='uncompressed')
+                else:
+                    df.to_pickle(tmp_path)
+                os.replace(tmp_path, data_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                if extension == '.pkl':
+                    raise
+                continue
+            return os.path.basename(data_path)
+
+    def _write_manifest(self):
+        path = self._manifest_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+    def open(self, run_key):
+        """
+        Start or resume the run identified by ``run_key``.
+
+        Returns:
+            dict: Completed tasks of an interrupted run with the same key,
+            ``{task name: {"stage", "seconds", "tables", "streamed"}}``
+        """
+        if not self.enabled:
+            return {}
+
+        try:
+            with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = None
+
+        if previous and previous.get('run_key') == run_key and previous.get('status') == 'running':
+            self.manifest = previous
+        else:
+            shutil.rmtree(self.run_dir, ignore_errors=True)
+            self.manifest = {'run_key': run_key, 'status': 'running', 'attempts': [],
+                             'tasks': {}, 'tables': {}, 'date_format_report': {}}
+        self.manifest['attempts'].append({'started_at': time.time(), 'stages': {}})
+        os.makedirs(self.run_dir, exist_ok=True)
+        self._write_manifest()
+        return dict(self.manifest['tasks'])
+
+    def _widen_stage(self, stage, started_at, finished_at):
+        timing = self.manifest['attempts'][-1]['stages'].setdefault(stage, {'started_at': started_at, 'finished_at': finished_at})
+        timing['started_at'] = min(timing['started_at'], started_at)
+        timing['finished_at'] = max(timing['finished_at'], finished_at)
+        timing['seconds'] = round(timing['finished_at'] - timing['started_at'], 3)
+
+    def record_stage(self, stage, started_at, finished_at):
+        """Widen a stage's time span in the current attempt to cover [started_at, finished_at]"""
+        if self.manifest is None:
+            return
+        with self.lock:
+            self._widen_stage(stage, started_at, finished_at)
+            self._write_manifest()
+
+    def save_task(self, task, tables, streamed, date_format_report):
+        """
+        Store the tables a finished task wrote and mark it completed.
+
+        Args:
+            task: The finished MergeTask, with its timings
+            tables: ``{table: DataFrame}`` written by the task
+            streamed: ``{table: {"records", "columns"}}`` streamed straight to CSV by the task
+            date_format_report: The merger's date format report so far
+
+        Returns:
+            bool: False if a table could not be stored; the task is then not marked completed
+        """
+        if self.manifest is None:
+            return False
+
+        stored = {}
+        for table, df in tables.items():
+            try:
+                stored[table] = self._write_table(table, df)
+            except Exception as e:
+                print(f"  ✗ Could not checkpoint {table}: {str(e)}")
+                return False
+
+        now = time.time()
+        with self.lock:
+            # A copy of a table stored in the other format by an earlier task
+            replaced = [self.manifest['tables'][table] for table, filename in stored.items()
+                        if self.manifest['tables'].get(table, filename) != filename]
+            self.manifest['tables'].update(stored)
+            self.manifest['tasks'][task.name] = {
+                'stage': task.stage,
+                'seconds': round(task.duration, 3),
+                'tables': list(stored),
+                'streamed': streamed
+            }
+            self.manifest['date_format_report'] = date_format_report
+            self._widen_stage(task.stage, now - task.duration, now)
+            self._write_manifest()
+        for filename in replaced:
+            path = os.path.join(self.run_dir, filename)
+            if os.path.exists(path):
+                os.remove(path)
+        return True
+
+    def load_tables(self):
+        """
+        Tables stored by the completed tasks, in their latest state.
+
+        Returns:
+            dict: ``{table: DataFrame}``
+        """
+        if self.manifest is None:
+            return {}
+        tables = {}
+        for table, filename in self.manifest['tables'].items():
+            path = os.path.join(self.run_dir, filename)
+            if filename.endswith('.pkl'):
+                tables[table] = pd.read_pickle(path)
+            else:
+                tables[table] = feather.read_table(path, memory_map=True).to_pandas()
+        return tables
+
+    @property
+    def date_format_report(self):
+        return self.manifest.get('date_format_report', {}) if self.manifest else {}
+
+    def complete(self):
+        """Mark the run completed and drop the stored tables, keeping the manifest and its timings"""
+        if self.manifest is None:
+            return
+        with self.lock:
+            for filename in self.manifest['tables'].values():
+                path = os.path.join(self.run_dir, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+            self.manifest['tables'] = {}
+            self.manifest['status'] = 'completed'
+            self._write_manifest()
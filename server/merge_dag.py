@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class MergeTask:
+    """One unit of merge work with the data it reads and writes"""
+
+    def __init__(self, name, stage, run, inputs=(), outputs=(), spec=None):
+        self.name = name
+        self.stage = stage
+        self.run = run
+        self.inputs = tuple(dict.fromkeys(inputs))
+        self.outputs = tuple(dict.fromkeys(outputs))
+        # JSON-serializable description of what the task does besides reading its inputs
+        self.spec = spec
+        self.depends_on = set()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def duration(self):
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+def link_tasks(tasks):
+    """
+    Add the dependencies implied by the order of the tasks: a task runs after
+    the last earlier task writing anything it reads or writes, so the result
+    matches running the tasks one after another.
+    """
+    last_writer = {}
+    for task in tasks:
+        for key in set(task.inputs) | set(task.outputs):
+            if key in last_writer:
+                task.depends_on.add(last_writer[key].name)
+        for key in task.outputs:
+            last_writer[key] = task
+    return tasks
+
+
+def run_tasks(tasks, workers=1, before_task=None, after_task=None):
+    """
+    Run linked tasks, each as soon as its dependencies have finished.
+
+    Args:
+        tasks: Tasks in their sequential order
+        workers: Threads running tasks at once; 1 runs them in order on the calling thread
+        before_task: Called with each task before it starts; may raise to stop the run
+        after_task: Called with each task once it has run, on the thread that ran it,
+            before any task depending on it starts
+
+    Returns:
+        dict: Task name -> task, with timings filled in
+    """
+    by_name = {task.name: task for task in tasks}
+
+    def execute(task):
+        task.started_at = time.perf_counter()
+        try:
+            task.run()
+        finally:
+            task.finished_at = time.perf_counter()
+        if after_task:
+            after_task(task)
+
+    if workers <= 1:
+        for task in tasks:
+            if before_task:
+                before_task(task)
+            execute(task)
+        return by_name
+
+    done = set()
+    pending = list(tasks)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="merge-task") as executor:
+        try:
+            while pending or running:
+                # Start everything that is ready, keeping the sequential order as priority
+                for task in [t for t in pending if t.depends_on <= done]:
+                    if before_task:
+                        before_task(task)
+                    pending.remove(task)
+                    running[executor.submit(execute, task)] = task
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task = running.pop(future)
+                    future.result()
+                    done.add(task.name)
+        except BaseException:
+            # Let the tasks already running finish, but start no more
+            for future in running:
+                future.cancel()
+            raise
+    return by_name
+
+
+def critical_path(tasks):
+    """
+    Longest chain of dependent tasks by measured duration.
+
+    Returns:
+        tuple: (total seconds, [task names along the path])
+    """
+    by_name = {task.name: task for task in tasks}
+    best = {}
+    for task in tasks:
+        # Tasks are in sequential order, so dependencies are always computed first
+        previous = max((best[name] for name in task.depends_on if name in by_name),
+                       key=lambda item: item[0], default=(0.0, []))
+        best[task.name] = (previous[0] + task.duration, previous[1] + [task.name])
+    return max(best.values(), key=lambda item: item[0], default=(0.0, []))
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import shutil
+
+# Bump when a change to the merge code changes its outputs for the same inputs
+FINGERPRINT_VERSION = 2
+
+MANIFEST_NAME = ".merge_fingerprints.json"
+
+
+def file_fingerprint(file_path):
+    """Size and modification time of a source file, or None if it does not exist"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def fingerprint(value):
+    """SHA-256 of a JSON-serializable value in canonical form"""
+    canonical = json.dumps([FINGERPRINT_VERSION, value], sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def load_manifest(output_dir):
+    """
+    Fingerprints of the tables written to an output directory by the last run.
+
+    Returns:
+        dict: ``{table: {"fingerprint", "records", "columns", "files"}}``
+    """
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get('version') != FINGERPRINT_VERSION:
+        return {}
+    return manifest.get('tables', {})
+
+
+def save_manifest(output_dir, tables):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': FINGERPRINT_VERSION, 'tables': tables}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def reuse_files(entry, previous_dir, output_dir):
+    """
+    Make a previous run's files for one table available in the output directory.
+
+    Returns:
+        bool: False if any of the files is missing
+    """
+    paths = [os.path.join(previous_dir, name) for name in entry.get('files', [])]
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    if os.path.abspath(previous_dir) == os.path.abspath(output_dir):
+        return True
+    for path in paths:
+        dest_path = os.path.join(output_dir, os.path.basename(path))
+        if os.path.lexists(dest_path):
+            os.remove(dest_path)
+        try:
+            os.link(path, dest_path)
+        except OSError:
+            shutil.copy2(path, dest_path)
+    return True
@@ -0,0 +1,290 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from script import BankDataMerger, MergeCancelled, MERGE_STAGES
+
+# Number of merges allowed to run at once; further jobs wait in the queue
+MERGE_MAX_CONCURRENT_JOBS = int(os.getenv("MERGE_MAX_CONCURRENT_JOBS", 2))
+
+# Finished jobs kept in memory for status queries
+MERGE_JOB_HISTORY = 100
+
+# How often job watchers check for changes
+JOB_POLL_SECONDS = 0.5
+
+FINISHED_STATUSES = {'succeeded', 'failed', 'cancelled'}
+
+
+class MergeJob:
+    """State of one merge submitted to the job manager."""
+
+    def __init__(self, job_id: str, user_id: Optional[str], output_dir: str, mapping_file: str,
+                 bank1_dir: str, bank2_dir: str):
+        self.id = job_id
+        self.user_id = user_id
+        self.output_dir = output_dir
+        self.mapping_file = mapping_file
+        self.bank1_dir = bank1_dir
+        self.bank2_dir = bank2_dir
+        self.previous_output_dir = None
+        self.attempts = 0
+        self.status = 'queued'
+        self.stage = None
+        self.step = 0
+        self.total_steps = len(MERGE_STAGES)
+        self.stages = []
+        self.error = None
+        self.files = []
+        self.task_timings = {}
+        self.critical_path = None
+        self.reused_tables = []
+        # Tasks a resumed run would have to redo because their tables could not be checkpointed
+        self.checkpoint_failures = []
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        # Bumped on every change so watchers know when to send an update
+        self.version = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "user_id": self.user_id,
+            "status": self.status,
+            "stage": self.stage,
+            "step": self.step,
+            "total_steps": self.total_steps,
+            "stages": list(self.stages),
+            "error": self.error,
+            "output_dir": self.output_dir,
+            "files": list(self.files),
+            "task_timings": dict(self.task_timings),
+            "critical_path": self.critical_path,
+            "reused_tables": list(self.reused_tables),
+            "checkpoint_failures": list(self.checkpoint_failures),
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+
+class MergeJobManager:
+    """
+    Runs merges in a bounded worker pool.
+
+    Every job writes to its own output directory under ``output_base_dir``.
+    Progress is recorded per stage of ``BankDataMerger.run_merge``. Cancelling
+    a queued job removes it from the queue; cancelling a running job stops it
+    at the next stage or output plan. A failed or cancelled job keeps its
+    partial output and checkpoint, and can be resumed from there. The output
+    directory of a job is deleted when the job drops out of the history.
+    """
+
+    def __init__(self, output_base_dir: str, max_workers: int = MERGE_MAX_CONCURRENT_JOBS,
+                 merger_options: Optional[Dict[str, Any]] = None):
+        self.output_base_dir = output_base_dir
+        self.max_workers = max_workers
+        self.merger_options = merger_options or {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="merge-job")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        os.makedirs(output_base_dir, exist_ok=True)
+
+    def submit(self, mapping_file: str, bank1_dir: str, bank2_dir: str,
+               user_id: Optional[str] = None) -> MergeJob:
+        """
+        Queue a merge.
+
+        Returns:
+            MergeJob: The queued job
+        """
+        job_id = uuid.uuid4().hex
+        job = MergeJob(job_id, user_id, os.path.join(self.output_base_dir, job_id), mapping_file,
+                       bank1_dir, bank2_dir)
+        with self.lock:
+            # Unchanged tables are reused from the user's last successful merge
+            previous = self._latest_succeeded(user_id) if user_id else None
+            job.previous_output_dir = previous.output_dir if previous else None
+            self.jobs[job_id] = job
+            forgotten_dirs = self._forget_old_jobs()
+        for output_dir in forgotten_dirs:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def resume(self, job_id: str) -> Optional[MergeJob]:
+        """
+        Queue a failed or cancelled job again. The merge resumes from the tasks
+        its checkpoint records as completed, as long as its inputs are unchanged.
+
+        Returns:
+            MergeJob: The job, or None if it does not exist
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status not in ('failed', 'cancelled'):
+                return job
+            job.status = 'queued'
+            job.error = None
+            job.finished_at = None
+            job.cancel_event = threading.Event()
+            job.version += 1
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[MergeJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self, user_id: Optional[str] = None) -> List[MergeJob]:
+        with self.lock:
+            return [job for job in self.jobs.values() if user_id is None or job.user_id == user_id]
+
+    def cancel(self, job_id: str) -> Optional[MergeJob]:
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            MergeJob: The job, or None if it does not exist
+        """
+        # Checked and changed under the lock so a job finishing meanwhile is never
+        # moved back to cancelling
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_event.set()
+            if job.future is not None and job.future.cancel():
+                # Never started
+                job.status = 'cancelled'
+                job.finished_at = time.time()
+            else:
+                job.status = 'cancelling'
+            job.version += 1
+        return job
+
+    async def watch(self, job_id: str):
+        """Yield the job state each time it changes, until the job finishes."""
+        job = self.get(job_id)
+        if job is None:
+            return
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                yield job.to_dict()
+                if job.finished:
+                    return
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+    async def wait(self, job_id: str) -> Optional[MergeJob]:
+        """Wait for a job to finish."""
+        async for _ in self.watch(job_id):
+            pass
+        return self.get(job_id)
+
+    def shutdown(self) -> None:
+        """Cancel every unfinished job and stop the worker pool."""
+        for job in self.list():
+            self.cancel(job.id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _progress_callback(self, job: MergeJob) -> Callable[[str, int, int], None]:
+        def report(stage, step, total_steps):
+            now = time.time()
+            with self.lock:
+                if job.stages:
+                    job.stages[-1]["finished_at"] = now
+                job.stages.append({"stage": stage, "started_at": now, "finished_at": None})
+                job.stage, job.step, job.total_steps = stage, step, total_steps
+                job.version += 1
+        return report
+
+    def _latest_succeeded(self, user_id: str) -> Optional[MergeJob]:
+        for job in reversed(self.jobs.values()):
+            if job.user_id == user_id and job.status == 'succeeded' and os.path.isdir(job.output_dir):
+                return job
+        return None
+
+    def _run(self, job: MergeJob) -> None:
+        with self.lock:
+            # A job cancelled while starting stays cancelling until the merge stops
+            if not job.cancel_event.is_set():
+                job.status = 'running'
+            job.started_at = time.time()
+            job.attempts += 1
+            job.version += 1
+        merger = None
+        try:
+            merger = BankDataMerger(job.mapping_file, job.bank1_dir, job.bank2_dir, job.output_dir,
+                                    progress_callback=self._progress_callback(job),
+                                    cancel_event=job.cancel_event, previous_output_dir=job.previous_output_dir,
+                                    **self.merger_options)
+            merger.run_merge()
+        except MergeCancelled:
+            self._finish(job, 'cancelled', checkpoint_failures=list(merger.checkpoint_failures))
+        except Exception as e:
+            self._finish(job, 'failed', error=str(e),
+                         checkpoint_failures=list(merger.checkpoint_failures) if merger else [])
+        else:
+            length, path = merger.critical_path
+            self._finish(job, 'succeeded', files=sorted(name for name in os.listdir(job.output_dir)
+                                                     if not name.startswith('.')),
+                         checkpoint_failures=list(merger.checkpoint_failures),
+                         reused_tables=list(merger.reused_tables),
+                         task_timings={name: round(duration, 3) for name, duration in merger.task_timings.items()},
+                         critical_path={"seconds": round(length, 3), "tasks": path})
+
+    def _finish(self, job: MergeJob, status: str, **changes: Any) -> None:
+        now = time.time()
+        with self.lock:
+            # A terminal status is never replaced
+            if job.finished:
+                return
+            if job.stages and job.stages[-1]["finished_at"] is None:
+                job.stages[-1]["finished_at"] = now
+            for name, value in {**changes, 'status': status, 'finished_at': now}.items():
+                setattr(job, name, value)
+            job.version += 1
+
+    def _forget_old_jobs(self) -> List[str]:
+        """
+        Drop the oldest finished jobs beyond MERGE_JOB_HISTORY.
+
+        A user's latest succeeded job is kept, since later merges reuse its
+        output. Failed and cancelled jobs keep their output and checkpoint for
+        resume until they are forgotten.
+
+        Returns:
+            list: Output directories of the forgotten jobs, to delete once the lock is released
+        """
+        latest = {}
+        for job in self.jobs.values():
+            if job.status == 'succeeded':
+                latest[job.user_id] = job
+        # Directories unfinished jobs still read unchanged tables from
+        in_use = {job.previous_output_dir for job in self.jobs.values() if not job.finished}
+        in_use.update(job.output_dir for job in latest.values() if job.user_id is not None)
+
+        finished = [job_id for job_id, job in self.jobs.items()
+                    if job.finished and not (job.user_id is not None and latest.get(job.user_id) is job)]
+        forgotten_dirs = []
+        for job_id in finished[:max(len(finished) - MERGE_JOB_HISTORY, 0)]:
+            job = self.jobs.pop(job_id)
+            if job.output_dir not in in_use:
+                forgotten_dirs.append(job.output_dir)
+        return forgotten_dirs
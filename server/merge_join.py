@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+# Plan join types and the pandas merge they run as
+JOIN_TYPES = {'inner': 'inner', 'left': 'left', 'right': 'right', 'full_outer': 'outer', 'outer': 'outer'}
+
+# Dedupe strategies that fill each column with the first non-null value of its group
+COALESCING_STRATEGIES = {'prefer_non_null', 'prefer_right_non_null'}
+
+# Column added by the join recording which side each row came from
+SIDE_COLUMN = '_merge_side'
+
+_JOIN_CODE_COLUMN = '_merge_join_code'
+
+
+def _as_key_strings(values):
+    """Key values as strings, so the same key stored as 7, 7.0 and '7' compares equal"""
+    if pd.api.types.is_float_dtype(values):
+        integral = values.dropna()
+        if (integral == np.floor(integral)).all():
+            values = values.astype('Int64')
+    return values.astype('string')
+
+
+def key_codes(*key_sets):
+    """
+    Encode composite keys as one int64 code per row, shared across the key sets.
+
+    Every key column is factorized over all sets together, then the per-column
+    codes are combined and factorized again so they stay dense. Rows with a
+    null in any key column get a distinct code of their own and never match.
+
+    Args:
+        key_sets: Lists of Series, one list per frame, with the same number of columns each
+
+    Returns:
+        list: One int64 code array per key set
+    """
+    lengths = [len(keys[0]) if keys else 0 for keys in key_sets]
+    combined = None
+    null = np.zeros(sum(lengths), dtype=bool)
+    for columns in zip(*key_sets):
+        if len({str(column.dtype) for column in columns}) > 1:
+            columns = [_as_key_strings(column) for column in columns]
+        codes, _ = pd.factorize(pd.concat(columns, ignore_index=True))
+        codes = codes.astype(np.int64)
+        null |= codes < 0
+        if combined is None:
+            combined = codes
+        else:
+            combined, _ = pd.factorize(combined * (codes.max() + 2) + codes + 1)
+            combined = combined.astype(np.int64)
+    if combined is None:
+        combined = np.arange(sum(lengths), dtype=np.int64)
+    combined[null] = combined.max(initial=-1) + 1 + np.arange(null.sum())
+    return np.split(combined, np.cumsum(lengths)[:-1])
+
+
+def join_frames(left, right, left_keys, right_keys, join_type, suffixes=('_bank1', '_bank2')):
+    """
+    Hash join two frames on composite keys given as Series aligned with each frame.
+
+    The keys are joined as int64 codes rather than as the original values, and
+    null keys never match. The result has ``SIDE_COLUMN`` set to 'left_only',
+    'right_only' or 'both'.
+    """
+    if join_type not in JOIN_TYPES:
+        raise ValueError(f"Unsupported join type '{join_type}', expected one of {', '.join(JOIN_TYPES)}")
+    if len(left_keys) != len(right_keys) or not left_keys:
+        raise ValueError(f"Join needs the same number of keys on both sides, got {len(left_keys)} and {len(right_keys)}")
+
+    left_codes, right_codes = key_codes([k.reset_index(drop=True) for k in left_keys],
+                                        [k.reset_index(drop=True) for k in right_keys])
+    merged = pd.merge(
+        left.reset_index(drop=True).assign(**{_JOIN_CODE_COLUMN: left_codes}),
+        right.reset_index(drop=True).assign(**{_JOIN_CODE_COLUMN: right_codes}),
+        on=_JOIN_CODE_COLUMN,
+        how=JOIN_TYPES[join_type],
+        suffixes=suffixes,
+        indicator=SIDE_COLUMN
+    )
+    merged[SIDE_COLUMN] = merged[SIDE_COLUMN].astype(str)
+    return merged.drop(columns=_JOIN_CODE_COLUMN)
+
+
+def restore_integer_dtype(values, *source_dtypes):
+    """
+    Undo the float upcast of an outer join for a coalesced column whose source
+    columns were all integers and which ended up without gaps.
+    """
+    if (pd.api.types.is_float_dtype(values) and source_dtypes
+            and all(pd.api.types.is_integer_dtype(dtype) for dtype in source_dtypes)
+            and values.notna().all()):
+        return values.astype(np.int64)
+    return values
+
+
+def _descending_ranks(values):
+    """Sort ranks putting the largest values first and nulls last"""
+    try:
+        codes, _ = pd.factorize(values, sort=True)
+    except TypeError:
+        # Mixed types; dates are written as ISO text, which sorts correctly as strings
+        codes, _ = pd.factorize(values.astype('string'), sort=True)
+    return np.where(codes < 0, 1, -codes.astype(np.int64))
+
+
+def dedupe_frame(df, keys, strategy='prefer_non_null', tie_breaker=None):
+    """
+    Collapse rows sharing the same dedupe keys into one row per key.
+
+    Rows are ranked by side (right first, for ``prefer_right_non_null`` on
+    joined frames), then by ``tie_breaker`` with the most recent value first,
+    then by position. The coalescing strategies take each column's first
+    non-null value in that order; any other strategy keeps the first row.
+    Rows with a null key are kept as they are.
+
+    Returns:
+        tuple: (deduplicated DataFrame in original row order, number of rows removed)
+    """
+    keys = [key for key in keys if key in df.columns]
+    if not keys or df.empty:
+        return df, 0
+
+    groups = key_codes([df[key].reset_index(drop=True) for key in keys])[0]
+    if not pd.Series(groups).duplicated().any():
+        return df, 0
+
+    position = np.arange(len(df))
+    sort_keys = [position]
+    if tie_breaker and tie_breaker in df.columns:
+        sort_keys.append(_descending_ranks(df[tie_breaker]))
+    if strategy == 'prefer_right_non_null' and SIDE_COLUMN in df.columns:
+        sort_keys.append((df[SIDE_COLUMN].to_numpy() == 'left_only').astype(np.int8))
+    order = np.lexsort(sort_keys)
+
+    ranked = df.iloc[order].reset_index(drop=True)
+    ranked_groups = groups[order]
+    if strategy in COALESCING_STRATEGIES:
+        grouped = ranked.groupby(ranked_groups, sort=False)
+        result = grouped.first()
+        # Groups come out in order of their best row; restore the order rows first appeared in
+        first_seen = pd.Series(position[order]).groupby(ranked_groups, sort=False).min()
+        result = result.iloc[np.argsort(first_seen.to_numpy(), kind='stable')]
+    else:
+        best = ~pd.Series(ranked_groups).duplicated().to_numpy()
+        result = ranked[best].iloc[np.argsort(order[best], kind='stable')]
+    return result.reset_index(drop=True), len(df) - len(result)
@@ -1,7 +1,241 @@
 import json
+import math
+import os
 from datetime import datetime
 
-def generate_mapping_prompt(dataset_a, dataset_b):
+# Rough size of the prompts we send: about four characters per token for
+# English text and JSON. Schemas that would exceed the budget are split into
+# several requests.
+CHARS_PER_TOKEN = 4
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 24000))
+
+# Column descriptions are cut to this length
+MAX_DESCRIPTION_CHARS = 200
+# Descriptions at least this long that occur more than once are sent once
+# and referenced by label
+SHARED_DESCRIPTION_MIN_CHARS = 24
+
+# Description given to source columns the local matcher has already mapped
+MAPPED_NOTE = "already mapped →"
+
+# Tells the model how to read those labels
+SHARED_DESCRIPTIONS_NOTE = ("Column descriptions written as a label such as @D1 stand for the text listed "
+                            "under \"Shared descriptions\"; never copy a label into your answer, "
+                            "use the description it stands for.")
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a prompt."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_description(description, limit=MAX_DESCRIPTION_CHARS):
+    """Collapse whitespace in a description and cut it to the given length."""
+    description = " ".join(str(description).split())
+    if len(description) > limit:
+        description = description[:limit - 3].rstrip() + "..."
+    return description
+
+
+def compact_json(value):
+    """Serialize without indentation, cutting long strings."""
+    def shorten(item):
+        if isinstance(item, dict):
+            return {key: shorten(v) for key, v in item.items()}
+        if isinstance(item, list):
+            return [shorten(v) for v in item]
+        if isinstance(item, str) and len(item) > MAX_DESCRIPTION_CHARS:
+            return truncate_description(item)
+        return item
+    return json.dumps(shorten(value), separators=(',', ':'), ensure_ascii=False)
+
+
+def schema_tables(database_info):
+    """
+    Tables of a schema in the layout ``extract_schema_from_dir`` produces.
+
+    Returns:
+        dict: ``{table_name: {column: description}}``, or None for other layouts
+    """
+    if isinstance(database_info, str):
+        try:
+            database_info = json.loads(database_info)
+        except json.JSONDecodeError:
+            return None
+    tables = database_info.get("Tables") if isinstance(database_info, dict) else None
+    if not isinstance(tables, dict):
+        return None
+    return {
+        name: (table.get("Table Columns") or {}) if isinstance(table, dict) else {}
+        for name, table in tables.items()
+    }
+
+
+def compact_schema(database_info, tables=None):
+    """
+    Render a schema as one line per column instead of indented JSON.
+
+    Descriptions are truncated, and long descriptions shared by several columns
+    are listed once under a label such as ``@D1``. Schemas in another layout
+    are serialized with ``compact_json``.
+
+    Args:
+        database_info (dict or str): Schema of one database
+        tables (list, optional): Only render these tables
+    """
+    all_tables = schema_tables(database_info)
+    if all_tables is None:
+        if isinstance(database_info, str):
+            return database_info.strip()
+        return compact_json(database_info)
+
+    selected = {name: columns for name, columns in all_tables.items()
+                if tables is None or name in tables}
+
+    counts = {}
+    for columns in selected.values():
+        for description in columns.values():
+            description = truncate_description(description)
+            counts[description] = counts.get(description, 0) + 1
+    labels = {}
+    for description, count in counts.items():
+        if count > 1 and len(description) >= SHARED_DESCRIPTION_MIN_CHARS:
+            labels[description] = f"@D{len(labels) + 1}"
+
+    lines = []
+    if isinstance(database_info, str):
+        database_info = json.loads(database_info)
+    if database_info.get("Database"):
+        lines.append(f"Database {database_info['Database']}")
+    for name, columns in selected.items():
+        lines.append(f"Table {name}")
+        for column, description in columns.items():
+            description = truncate_description(description)
+            description = labels.get(description, description)
+            lines.append(f"- {column}: {description}" if description else f"- {column}")
+    if labels:
+        lines.append("Shared descriptions")
+        lines.extend(f"{label}: {description}" for description, label in labels.items())
+    return "\n".join(lines)
+
+
+def chunk_schema_tables(database_info, overhead_tokens=0, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Group the tables of a schema so each group's prompt fits the token budget.
+
+    A table that does not fit on its own still gets a group to itself.
+
+    Returns:
+        list: Lists of table names, or ``[None]`` when no split is needed or possible
+    """
+    all_tables = schema_tables(database_info)
+    if all_tables is None or len(all_tables) < 2:
+        return [None]
+    if overhead_tokens + estimate_tokens(compact_schema(database_info)) <= token_budget:
+        return [None]
+
+    groups = []
+    current, current_tokens = [], overhead_tokens
+    for name in all_tables:
+        table_tokens = estimate_tokens(compact_schema(database_info, [name]))
+        if current and current_tokens + table_tokens > token_budget:
+            groups.append(current)
+            current, current_tokens = [], overhead_tokens
+        current.append(name)
+        current_tokens += table_tokens
+    groups.append(current)
+    return groups
+
+def split_database(database_info, overhead_tokens=0, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Split a schema into parts whose prompts each fit the token budget.
+
+    Accepts the workbook layout of ``extract_schema_from_dir`` and the
+    ``{"database", "tables": [...]}`` layout of the schema analysis.
+
+    Returns:
+        list: Schemas in the same layout, or the original schema alone when no
+        split is needed or possible
+    """
+    if isinstance(database_info, str):
+        try:
+            database_info = json.loads(database_info)
+        except json.JSONDecodeError:
+            return [database_info]
+
+    if schema_tables(database_info) is not None:
+        groups = chunk_schema_tables(database_info, overhead_tokens, token_budget)
+        if groups == [None]:
+            return [database_info]
+        return [{**database_info, "Tables": {name: database_info["Tables"][name] for name in group}}
+                for group in groups]
+
+    tables = database_info.get("tables") if isinstance(database_info, dict) else None
+    if not isinstance(tables, list) or len(tables) < 2:
+        return [database_info]
+    if overhead_tokens + estimate_tokens(compact_schema(database_info)) <= token_budget:
+        return [database_info]
+
+    parts = []
+    current, current_tokens = [], overhead_tokens
+    for table in tables:
+        table_tokens = estimate_tokens(compact_schema({**database_info, "tables": [table]}))
+        if current and current_tokens + table_tokens > token_budget:
+            parts.append(current)
+            current, current_tokens = [], overhead_tokens
+        current.append(table)
+        current_tokens += table_tokens
+    parts.append(current)
+    return [{**database_info, "tables": part} for part in parts]
+
+
+def database_table_names(database_info):
+    """Names of the tables in a schema of either layout."""
+    tables = schema_tables(database_info)
+    if tables is not None:
+        return list(tables)
+    if not isinstance(database_info, dict):
+        return []
+    return [table.get("name") for table in database_info.get("tables", [])
+            if isinstance(table, dict) and table.get("name")]
+
+
+def generate_mapping_prompts(dataset_a, dataset_b, focus_tables=None, candidates=None,
+                             token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Mapping prompts for Dataset A against Dataset B, splitting Dataset A by
+    table when a single prompt would exceed the token budget.
+
+    Arguments are those of ``generate_mapping_prompt``; each prompt only gets
+    the candidates of its own Dataset A tables.
+
+    Returns:
+        list: Prompt strings; their answers each map a subset of Dataset A
+    """
+    if isinstance(dataset_a, str):
+        dataset_a = json.loads(dataset_a)
+
+    empty_a = {**dataset_a, "Tables": {}} if schema_tables(dataset_a) is not None else {**dataset_a, "tables": []}
+    overhead = estimate_tokens(generate_mapping_prompt(empty_a, dataset_b, focus_tables, candidates))
+    parts = split_database(dataset_a, overhead, token_budget)
+
+    prompts = []
+    for part in parts:
+        part_candidates = candidates
+        if candidates and len(parts) > 1:
+            names = database_table_names(part)
+            part_candidates = {column: targets for column, targets in candidates.items()
+                               if any(column.startswith(f"{name}.") for name in names)}
+        prompts.append(generate_mapping_prompt(part, dataset_b, focus_tables, part_candidates))
+
+    for prompt in prompts:
+        tokens = estimate_tokens(prompt)
+        if tokens > token_budget:
+            print(f"Mapping prompt is about {tokens} tokens, over the {token_budget} token budget")
+    return prompts
+
+
+def generate_mapping_prompt(dataset_a, dataset_b, focus_tables=None, candidates=None):
     """
     Generates a structured prompt to guide an AI model in creating
     a field-level mapping and transformation plan between Dataset A and B.
@@ -9,6 +243,10 @@ def generate_mapping_prompt(dataset_a, dataset_b):
     Args:
         dataset_a (dict or str): Source dataset schema (Bank1)
         dataset_b (dict or str): Target dataset schema (Bank2)
+        focus_tables (list, optional): Dataset B tables this request covers when
+            the mapping is generated in several parts
+        candidates (dict, optional): Likely Dataset B columns per Dataset A
+            column (``"table.column"``) found by the local matcher
     
     Returns:
         str: A complete prompt string ready for the LLM.
@@ -20,9 +258,32 @@ def generate_mapping_prompt(dataset_a, dataset_b):
     if isinstance(dataset_b, str):
         dataset_b = json.loads(dataset_b)
 
-    # Pretty print JSON for inclusion in the prompt
-    dataset_a_json = json.dumps(dataset_a, indent=4, ensure_ascii=False)
-    dataset_b_json = json.dumps(dataset_b, indent=4, ensure_ascii=False)
+    # Whitespace in the schemas only costs tokens
+    dataset_a_json = compact_schema(dataset_a)
+    dataset_b_json = compact_schema(dataset_b)
+
+    # Restrict a partial request to its own target tables
+    scope_section = ""
+    if focus_tables:
+        scope_section = f"""
+### SCOPE
+This request covers only these Dataset B tables: {", ".join(focus_tables)}.
+- Only return mappings whose target table is one of them (or an extras table linked to one of them).
+- Other Dataset B tables are handled by separate requests; do not map Dataset A fields into them.
+
+---
+"""
+
+    # Hints from the local matcher for the columns it could not settle
+    if candidates:
+        scope_section += f"""
+### CANDIDATES
+Likely Dataset B columns for some Dataset A fields, found by name similarity (score in brackets).
+Confirm or correct them; they are hints, not decisions.
+{compact_json(candidates)}
+
+---
+"""
 
     # Build the full structured prompt
     prompt = f"""
@@ -91,9 +352,11 @@ All applied transformations must also be listed under `"applied_transformations"
 - All mappings should include a rationale and confidence value.
 - All extra fields must have `action: preserve` and either `extend_table` or `extras_table`.
 - Keep consistent table/column naming for clarity in the final merged schema.
+- {SHARED_DESCRIPTIONS_NOTE}
+- Dataset A columns described as `{MAPPED_NOTE} <table.column>` are mapped already: do not return mappings for them, but do use them as link keys and join keys where they fit.
 
 ---
-
+{scope_section}
 ### DATASET A (Bank1)
 {dataset_a_json}
 
@@ -103,29 +366,64 @@ All applied transformations must also be listed under `"applied_transformations"
     return prompt.strip()
 
 
-def generate_relationship_prompt(source_info, target_info):
-    schema_prompt = """
-            Analyze the following database schemas and identify:
-            1. Primary keys for each table
-            2. Foreign key relationships between tables
-            3. Table structures
-            4. Sources database: will be source and Target database: will be target
-            
-            Return only a valid JSON object with this structure:
-            {
-                "source": {
-                    "database": "<name>",
-                    "tables": [{
-                        "name": "<table_name>",
-                        "primaryKey": "<column>",
-                        "foreignKeys": [{"column": "<col>", "references": "<table.column>"}],
-                        "columns": ["col1": "column_def_from schema", "col2": "column_def_from schema"]
-                    }]
-                },
-                "target": { ... }
-            }
-            
-            Schema Information:
-            """ + json.dumps({"source": source_info, "target": target_info}, indent=2)
-
-    return schema_prompt
+RELATIONSHIP_INSTRUCTIONS = """Analyze the following database schema and identify:
+1. Primary keys for each table
+2. Foreign key relationships between tables
+3. Table structures
+{extra}
+Return only a valid JSON object with this structure:
+{structure}
+{note}
+
+Schema Information:
+"""
+
+DATABASE_STRUCTURE = (
+    '{"database": "<name>", "tables": [{"name": "<table_name>", "primaryKey": "<column>", '
+    '"foreignKeys": [{"column": "<col>", "references": "<table.column>"}], '
+    '"columns": ["col1": "column_def_from schema", "col2": "column_def_from schema"]}]}'
+)
+
+
+def generate_database_relationship_prompt(database_info, role, tables=None):
+    """
+    Builds the relationship-analysis prompt for a single database, so the
+    source and target schemas can be analyzed by independent requests.
+    
+    Args:
+        database_info (dict or str): Schema of one database
+        role (str): "source" or "target"
+        tables (list, optional): Only describe these tables; the others are
+            listed by name so foreign keys can still point at them
+    
+    Returns:
+        str: A complete prompt string ready for the LLM.
+    """
+    extra = ""
+    if tables is not None:
+        other_tables = [name for name in schema_tables(database_info) if name not in tables]
+        if other_tables:
+            extra = ("Only return the tables below. The database also has these tables, "
+                     f"which foreign keys may reference: {', '.join(other_tables)}\n")
+    schema_prompt = RELATIONSHIP_INSTRUCTIONS.format(extra=extra, structure=DATABASE_STRUCTURE,
+                                                     note=SHARED_DESCRIPTIONS_NOTE)
+    return schema_prompt + f"### {role}\n{compact_schema(database_info, tables)}"
+
+
+def generate_database_relationship_prompts(database_info, role, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Relationship-analysis prompts for one database, split by table when a
+    single prompt would exceed the token budget.
+    
+    Returns:
+        list: Prompt strings; their answers each describe a subset of the tables
+    """
+    overhead = estimate_tokens(generate_database_relationship_prompt({"Tables": {}}, role))
+    groups = chunk_schema_tables(database_info, overhead, token_budget)
+    prompts = [generate_database_relationship_prompt(database_info, role, tables) for tables in groups]
+    for prompt in prompts:
+        tokens = estimate_tokens(prompt)
+        if tokens > token_budget:
+            print(f"{role.capitalize()} schema prompt is about {tokens} tokens, "
+                  f"over the {token_budget} token budget")
+    return prompts
@@ -1,8 +1,96 @@
 import pandas as pd
+import asyncio
 import json
+import multiprocessing
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def extract_schema_from_dir(dir_path):
+from source_cache import file_sha256
+
+# Parsed schema workbooks kept in memory, and optionally on disk, by content hash
+SCHEMA_CACHE_SIZE = 128
+SCHEMA_CACHE_DIR = os.getenv("SCHEMA_CACHE_DIR")
+
+# Worker processes parsing schema workbooks for the async API, shared by all requests
+SCHEMA_PARSE_WORKERS = int(os.getenv("SCHEMA_PARSE_WORKERS", os.cpu_count() or 1))
+
+
+class SchemaCache:
+    """LRU cache of parsed schema workbooks keyed by workbook content hash."""
+
+    def __init__(self, max_entries, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, digest):
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def get(self, digest):
+        with self.lock:
+            if digest in self.entries:
+                self.entries.move_to_end(digest)
+                self.hits += 1
+                return self.entries[digest]
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(digest), 'r', encoding='utf-8') as f:
+                    database_json = json.load(f)
+            except (OSError, ValueError):
+                database_json = None
+            if database_json is not None:
+                with self.lock:
+                    self.disk_hits += 1
+                self._remember(digest, database_json)
+                return database_json
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, digest, database_json):
+        self._remember(digest, database_json)
+        if self.disk_dir:
+            tmp_path = f"{self._disk_path(digest)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(database_json, f, ensure_ascii=False)
+            os.replace(tmp_path, self._disk_path(digest))
+
+    def _remember(self, digest, database_json):
+        with self.lock:
+            self.entries[digest] = database_json
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "disk_dir": self.disk_dir
+            }
+
+
+schema_cache = SchemaCache(SCHEMA_CACHE_SIZE, SCHEMA_CACHE_DIR)
+
+
+def find_schema_file(dir_path):
     # Find schema files in directory
     schema_files = [f for f in os.listdir(dir_path) if f.endswith("_Schema.xlsx")]
 
@@ -10,15 +98,16 @@ def extract_schema_from_dir(dir_path):
     if len(schema_files) != 1:
         raise ValueError(f"None or more than one '_Schema.xlsx' file found in directory: {dir_path}")
 
-    file_path = os.path.join(dir_path, schema_files[0])
-    file_name = os.path.basename(file_path)
+    return os.path.join(dir_path, schema_files[0])
+
 
+def parse_schema_workbook(file_path):
     # Read all sheets
     all_sheets = pd.read_excel(file_path, sheet_name=None, header=None)
 
     database_json = {
         "Database": "Source",
-        "filename": file_name,
+        "filename": os.path.basename(file_path),
         "Tables": {}
     }
 
@@ -63,4 +152,83 @@ def extract_schema_from_dir(dir_path):
                 "Table Columns": table_columns
             }
 
+    return database_json
+
+
+def schema_to_json(database_json, file_path):
+    # The same workbook may have been uploaded under another name
+    database_json = {**database_json, "filename": os.path.basename(file_path)}
     return json.dumps(database_json, indent=4, ensure_ascii=False)
+
+
+def extract_schema_from_dir(dir_path):
+    file_path = find_schema_file(dir_path)
+
+    # An unchanged workbook (by content) is only ever parsed once
+    digest = file_sha256(file_path)
+    database_json = schema_cache.get(digest)
+    if database_json is None:
+        database_json = parse_schema_workbook(file_path)
+        schema_cache.put(digest, database_json)
+
+    return schema_to_json(database_json, file_path)
+
+
+_schema_executor = None
+_schema_executor_lock = threading.Lock()
+
+
+def get_schema_executor():
+    """Process pool used by extract_schema_from_dir_async, created on first use"""
+    global _schema_executor
+    with _schema_executor_lock:
+        if _schema_executor is None:
+            # The server process runs threads, so its workers must not be forked from it
+            mp_context = multiprocessing.get_context(
+                'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            )
+            _schema_executor = ProcessPoolExecutor(max_workers=SCHEMA_PARSE_WORKERS, mp_context=mp_context)
+        return _schema_executor
+
+
+def reset_schema_executor(executor):
+    """Drop a broken pool so the next get_schema_executor starts a new one"""
+    global _schema_executor
+    with _schema_executor_lock:
+        # Another request may already have replaced it
+        if _schema_executor is executor:
+            _schema_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_schema_executor():
+    global _schema_executor
+    with _schema_executor_lock:
+        if _schema_executor is not None:
+            _schema_executor.shutdown(wait=False, cancel_futures=True)
+            _schema_executor = None
+
+
+async def extract_schema_from_dir_async(dir_path):
+    """
+    Same as extract_schema_from_dir without blocking the event loop.
+
+    Hashing and the cache lookup run in a thread of this process, so cache hits
+    never touch the pool; workbooks that do need parsing go to a worker process.
+    """
+    file_path = await asyncio.to_thread(find_schema_file, dir_path)
+    digest = await asyncio.to_thread(file_sha256, file_path)
+    database_json = await asyncio.to_thread(schema_cache.get, digest)
+    if database_json is None:
+        loop = asyncio.get_running_loop()
+        executor = get_schema_executor()
+        try:
+            database_json = await loop.run_in_executor(executor, parse_schema_workbook, file_path)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a new pool and try once more
+            print(f"Schema parse pool broke while parsing {os.path.basename(file_path)}, restarting it")
+            reset_schema_executor(executor)
+            database_json = await loop.run_in_executor(get_schema_executor(), parse_schema_workbook, file_path)
+        await asyncio.to_thread(schema_cache.put, digest, database_json)
+
+    return schema_to_json(database_json, file_path)
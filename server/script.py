@@ -4,18 +4,192 @@ import json
 import os
 import uuid
 from datetime import datetime
-import re
+import copy
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from merge_dag import MergeTask, link_tasks, run_tasks, critical_path
+from merge_checkpoint import MergeCheckpoint, CHECKPOINT_DIR_NAME
+from mapping_spec import MappingSpec, extras_handling
+from merge_join import join_frames, dedupe_frame, restore_integer_dtype, SIDE_COLUMN
+from merge_fingerprints import file_fingerprint, fingerprint, load_manifest, save_manifest, reuse_files
+from source_cache import SourceFileCache
+
+# Simple country code mapping (in practice, use a comprehensive library)
+COUNTRY_CODE_MAPPING = {
+    'UNITED STATES': 'USA', 'US': 'USA', 'USA': 'USA', 'UNITED STATES OF AMERICA': 'USA',
+    'UNITED KINGDOM': 'GBR', 'UK': 'GBR', 'GREAT BRITAIN': 'GBR',
+    'CANADA': 'CAN', 'CA': 'CAN',
+    'GERMANY': 'DEU', 'DE': 'DEU',
+    'FRANCE': 'FRA', 'FR': 'FRA',
+    'AUSTRALIA': 'AUS', 'AU': 'AUS',
+    'JAPAN': 'JPN', 'JP': 'JPN',
+    'CHINA': 'CHN', 'CN': 'CHN',
+    'INDIA': 'IND', 'IN': 'IND'
+}
+
+CURRENCY_CODE_MAPPING = {
+    'USD': 'USD', 'US$': 'USD', '$': 'USD', 'US DOLLAR': 'USD',
+    'EUR': 'EUR', 'EURO': 'EUR', '€': 'EUR',
+    'GBP': 'GBP', 'POUND': 'GBP', '£': 'GBP', 'BRITISH POUND': 'GBP',
+    'JPY': 'JPY', 'YEN': 'JPY', '¥': 'JPY',
+    'CAD': 'CAD', 'CA$': 'CAD', 'CANADIAN DOLLAR': 'CAD',
+    'AUD': 'AUD', 'AUSTRALIAN DOLLAR': 'AUD',
+    'INR': 'INR', 'RUPEE': 'INR', '₹': 'INR'
+}
+
+# Date formats tried (in order) when parsing date columns
+DATE_FORMATS = [
+    '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d',
+    '%m-%d-%Y', '%d-%m-%Y', '%Y.%m.%d', '%d.%m.%Y',
+    '%Y%m%d', '%d%m%Y', '%m%d%Y'
+]
+
+# Bank1 transaction tables that can be streamed from CSV in fixed-size chunks
+STREAMED_TRANSACTION_TABLES = {
+    'CurSav Account Transactions',
+    'Fixed Term Account Transactions',
+    'Loan Account Transactions'
+}
+
+# Number of values sampled per column when inferring its date format(s)
+DATE_SAMPLE_SIZE = 500
+
+# Columns whose distinct values make up at most this share of their rows are
+# transformed once per distinct value and broadcast back through the codes
+FACTORIZE_MAX_RATIO = 0.1
+
+# Maximum number of transformed distinct values memoized across tables in a run
+FACTORIZE_MEMO_SIZE = 100000
+
+# Stages of run_merge, in order, as reported to progress callbacks
+MERGE_STAGES = ['load', 'plans', 'normalized', 'transactions', 'extras', 'save']
+
+# Bank1 columns each kind of merge task reads besides its mapped source columns:
+# the IDs that customer, account and transaction keys are generated from
+SOURCE_KEY_COLUMNS = {
+    'plans': ['customerId', 'accountId'],
+    'normalized': ['customerId'],
+    'transactions': ['transactionReference', 'accountId']
+}
+
+# Mapping fields that affect merged data, as opposed to review metadata
+MAPPING_DATA_FIELDS = ['id', 'source', 'target', 'transform', 'extra_field_handling']
+
+class MergeCancelled(Exception):
+    """Raised inside run_merge when the merge has been cancelled"""
+
+def source_usecols(columns):
+    """usecols for the CSV and Excel readers: only the given columns, ignoring any the file lacks"""
+    if columns is None:
+        return None
+    columns = set(columns)
+    return lambda column: column in columns
+
+def read_source_file(file_path, cache_dir=None, columns=None):
+    """Read a source file, or only the given columns of it, going through the
+    parsed-table cache when enabled.
+    """
+    source_cache = SourceFileCache(cache_dir) if cache_dir else None
+    digest = None
+    if source_cache and source_cache.enabled:
+        df, digest = source_cache.load(file_path, columns)
+        if df is not None:
+            return df, "cache hit"
+    return parse_source_file(file_path, cache_dir, columns, digest)
+
+def parse_source_file(file_path, cache_dir=None, columns=None, digest=None):
+    """Parse a source file, or only the given columns of it, and store it in the
+    parsed-table cache when enabled. digest is its content hash, if already known.
+    
+    Kept at module level so it can run in a worker process.
+    """
+    source_cache = SourceFileCache(cache_dir) if cache_dir else None
+    if file_path.endswith('.xlsx'):
+        df = pd.read_excel(file_path, usecols=source_usecols(columns))
+    elif file_path.endswith('.csv'):
+        df = pd.read_csv(file_path, usecols=source_usecols(columns))
+    else:
+        raise ValueError(f"Unsupported file type: {os.path.basename(file_path)}")
+        
+    if source_cache and source_cache.enabled:
+        cached = source_cache.store(file_path, df, digest, columns)
+        return df, "cache miss, cached" if cached else "cache miss, not cacheable"
+    return df, None
 
 class BankDataMerger:
-    def __init__(self, mapping_file_path, bank1_dir, bank2_dir, output_dir):
+    def __init__(self, mapping_file_path, bank1_dir, bank2_dir, output_dir, date_parsing='infer',
+                 cache_dir=None, load_workers=1, stream_chunk_size=None,
+                 progress_callback=None, cancel_event=None, merge_workers=1,
+                 incremental=True, previous_output_dir=None, checkpoint=True):
         self.mapping_file_path = mapping_file_path
         self.bank1_dir = bank1_dir
         self.bank2_dir = bank2_dir
         self.output_dir = output_dir
         self.mapping_data = None
+        self.mapping_spec = None
         self.loaded_data = {}
         self.merged_data = {}
         
+        # Bank1 columns to read per loaded_data key, from the mappings; keys not
+        # listed (and all Bank2 tables, whose columns are all output) are read whole
+        self.source_columns = {}
+        
+        # 'infer' samples each date column for its dominant format(s);
+        # 'sequential' tries every known format in order on every row
+        self.date_parsing = date_parsing
+        self.date_format_report = {}
+        
+        # Bounded memo of (transform, value) -> transformed value shared by all tables
+        self.transform_memo = OrderedDict()
+        self.factorize_stats = {'columns': 0, 'rows': 0, 'unique_values': 0, 'memo_hits': 0}
+        
+        # Parsed source tables cached on disk between runs (disabled when cache_dir is None)
+        self.cache_dir = cache_dir
+        
+        # Number of processes used to load source files (1 loads them one at a time)
+        self.load_workers = load_workers
+        
+        # When set, Bank1 transaction CSVs are read and written this many rows at a time
+        # instead of being loaded whole; streamed tables are recorded here, not in merged_data
+        self.stream_chunk_size = stream_chunk_size
+        self.streamed_tables = {}
+        
+        # Seed -> UUID cache shared by every key column generated in a run
+        self.uuid_cache = {}
+        self.uuid_stats = {'rows': 0, 'seeds_hashed': 0}
+        
+        # Called as progress_callback(stage, step, total_steps) when a stage starts;
+        # setting cancel_event stops the merge at the next stage or output plan
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        
+        # Threads running independent table tasks at once (1 runs them in order);
+        # the lock guards the memo, caches and reports those tasks share
+        self.merge_workers = merge_workers
+        self.state_lock = threading.Lock()
+        self.task_timings = {}
+        self.critical_path = (0.0, [])
+        self.current_stage = None
+        
+        # Tables whose inputs, mappings and plan are unchanged since the run that wrote
+        # previous_output_dir (default: output_dir) are reused instead of rebuilt
+        self.incremental = incremental
+        self.previous_output_dir = previous_output_dir or output_dir
+        self.table_fingerprints = {}
+        self.reused_tables = {}
+        self.unsaved_tables = set()
+        
+        # The tables each task writes are checkpointed in the run directory, so a
+        # failed or cancelled run started again with the same inputs resumes where it stopped
+        self.checkpoint = MergeCheckpoint(os.path.join(output_dir, CHECKPOINT_DIR_NAME)) if checkpoint else None
+        self.resumed_tasks = {}
+        # Tasks whose tables could not be checkpointed and would be run again on resume
+        self.checkpoint_failures = []
+        
         # Default file mappings as fallback
         self.default_bank1_files = {
             "Customer": "Bank1_Mock_Customer.xlsx",
@@ -44,7 +218,11 @@ class BankDataMerger:
         """Load the mapping JSON file and extract file mappings"""
         with open(self.mapping_file_path, 'r', encoding='utf-8') as f:
             self.mapping_data = json.load(f)
-        print("✓ Mapping data loaded successfully")
+        
+        # Validated and indexed, with every transform resolved, before any data is read
+        self.mapping_spec = MappingSpec(self.mapping_data, self.resolve_transform)
+        print(f"✓ Mapping data loaded successfully: {len(self.mapping_spec.mappings)} mappings "
+              f"into {len(self.mapping_spec.by_target_table)} tables")
         
         # Extract file mappings from the JSON structure with fallbacks
         try:
@@ -64,69 +242,171 @@ class BankDataMerger:
         print(f"  Bank1 files: {len(self.bank1_files)} tables")
         print(f"  Bank2 files: {len(self.bank2_files)} tables")
         
-    def load_bank_files(self):
-        """Load all Bank1 and Bank2 files based on available mappings"""
-        print("Loading Bank1 files...")
-        for table_name, filename in self.bank1_files.items():
-            file_path = os.path.join(self.bank1_dir, filename)
-            if os.path.exists(file_path):
+    def report_loaded_file(self, table_name, filename, df, cache_status):
+        """Print the summary of a loaded source table"""
+        suffix = f" ({cache_status})" if cache_status else ""
+        print(f"  ✓ Loaded {table_name} from {filename}{suffix}")
+        # Print column info for debugging
+        print(f"    Columns: {list(df.columns)}")
+        if len(df) > 0:
+            print(f"    Sample data shape: {df.shape}")
+    
+    def is_streamed_source(self, bank, table_name, filename):
+        """Whether a source file is streamed during transaction processing instead of loaded"""
+        return (bool(self.stream_chunk_size) and bank == "bank1"
+                and table_name in STREAMED_TRANSACTION_TABLES and filename.endswith('.csv'))
+    
+    def load_bank_files(self, keys=None):
+        """Load all Bank1 and Bank2 files based on available mappings, or only the given bank_table keys"""
+        if self.load_workers and self.load_workers > 1:
+            self.load_bank_files_parallel(keys)
+            return
+            
+        for bank, bank_dir, bank_files in (("bank1", self.bank1_dir, self.bank1_files),
+                                           ("bank2", self.bank2_dir, self.bank2_files)):
+            print(f"Loading {bank.capitalize()} files...")
+            for table_name, filename in bank_files.items():
+                file_path = os.path.join(bank_dir, filename)
+                if keys is not None and f"{bank}_{table_name}" not in keys:
+                    continue
+                if self.is_streamed_source(bank, table_name, filename):
+                    print(f"  ↷ {table_name} will be streamed from {filename}")
+                elif os.path.exists(file_path):
+                    try:
+                        df, cache_status = read_source_file(file_path, self.cache_dir,
+                                                            self.source_columns_list(f"{bank}_{table_name}"))
+                        self.loaded_data[f"{bank}_{table_name}"] = df
+                        self.report_loaded_file(table_name, filename, df, cache_status)
+                    except Exception as e:
+                        print(f"  ✗ Error loading {filename}: {str(e)}")
+                else:
+                    print(f"  ✗ File not found: {file_path}")
+    
+    def load_bank_files_parallel(self, keys=None):
+        """Load all Bank1 and Bank2 files concurrently in a process pool"""
+        print(f"Loading Bank1 and Bank2 files with up to {self.load_workers} workers...")
+        tasks = []
+        for bank, bank_dir, bank_files in (("bank1", self.bank1_dir, self.bank1_files),
+                                           ("bank2", self.bank2_dir, self.bank2_files)):
+            for table_name, filename in bank_files.items():
+                file_path = os.path.join(bank_dir, filename)
+                if keys is not None and f"{bank}_{table_name}" not in keys:
+                    continue
+                if self.is_streamed_source(bank, table_name, filename):
+                    print(f"  ↷ {table_name} will be streamed from {filename}")
+                elif os.path.exists(file_path):
+                    tasks.append((f"{bank}_{table_name}", table_name, filename, file_path))
+                else:
+                    print(f"  ✗ File not found: {file_path}")
+                    
+        if not tasks:
+            return
+            
+        # Cache hits are memory-mapped in this process; only files that need
+        # parsing go to the pool, whose workers pickle their tables back
+        results = {}
+        misses = []
+        source_cache = SourceFileCache(self.cache_dir) if self.cache_dir else None
+        for key, table_name, filename, file_path in tasks:
+            digest = None
+            if source_cache and source_cache.enabled:
                 try:
-                    if filename.endswith('.xlsx'):
-                        self.loaded_data[f"bank1_{table_name}"] = pd.read_excel(file_path)
-                    elif filename.endswith('.csv'):
-                        self.loaded_data[f"bank1_{table_name}"] = pd.read_csv(file_path)
-                    print(f"  ✓ Loaded {table_name} from {filename}")
-                    # Print column info for debugging
-                    df = self.loaded_data[f"bank1_{table_name}"]
-                    print(f"    Columns: {list(df.columns)}")
-                    if len(df) > 0:
-                        print(f"    Sample data shape: {df.shape}")
+                    df, digest = source_cache.load(file_path, self.source_columns_list(key))
                 except Exception as e:
                     print(f"  ✗ Error loading {filename}: {str(e)}")
-            else:
-                print(f"  ✗ File not found: {file_path}")
+                    continue
+                if df is not None:
+                    results[key] = df
+                    self.report_loaded_file(table_name, filename, df, "cache hit")
+                    continue
+            misses.append((key, table_name, filename, file_path, digest))
+            
+        if misses:
+            self.parse_files_in_pool(misses, results)
+                    
+        # Keep loaded_data in file-mapping order regardless of completion order
+        for key, _, _, _ in tasks:
+            if key in results:
+                self.loaded_data[key] = results[key]
                 
-        print("Loading Bank2 files...")
-        for table_name, filename in self.bank2_files.items():
-            file_path = os.path.join(self.bank2_dir, filename)
-            if os.path.exists(file_path):
+    def parse_files_in_pool(self, misses, results):
+        """Parse source files in worker processes, adding their tables to results"""
+        # Merges run in threads of the server process, which must not be forked
+        mp_context = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        )
+        with ProcessPoolExecutor(max_workers=min(self.load_workers, len(misses)),
+                                 mp_context=mp_context) as executor:
+            futures = {
+                executor.submit(parse_source_file, file_path, self.cache_dir,
+                                self.source_columns_list(key), digest): (key, table_name, filename)
+                for key, table_name, filename, file_path, digest in misses
+            }
+            for future in as_completed(futures):
+                key, table_name, filename = futures[future]
                 try:
-                    if filename.endswith('.xlsx'):
-                        self.loaded_data[f"bank2_{table_name}"] = pd.read_excel(file_path)
-                    elif filename.endswith('.csv'):
-                        self.loaded_data[f"bank2_{table_name}"] = pd.read_csv(file_path)
-                    print(f"  ✓ Loaded {table_name} from {filename}")
-                    # Print column info for debugging
-                    df = self.loaded_data[f"bank2_{table_name}"]
-                    print(f"    Columns: {list(df.columns)}")
-                    if len(df) > 0:
-                        print(f"    Sample data shape: {df.shape}")
+                    df, cache_status = future.result()
+                    results[key] = df
+                    self.report_loaded_file(table_name, filename, df, cache_status)
                 except Exception as e:
                     print(f"  ✗ Error loading {filename}: {str(e)}")
-            else:
-                print(f"  ✗ File not found: {file_path}")
                 
+    def required_source_columns(self, tasks):
+        """
+        Bank1 columns the tasks read, by loaded_data key: mapped source columns,
+        join and link keys, and the ID columns keys are generated from.
+        """
+        columns = {}
+        for task in tasks:
+            if task.spec is None:
+                continue
+            needed = set(SOURCE_KEY_COLUMNS.get(task.stage, []))
+            for mapping in task.spec.get('mappings', []):
+                needed.add(mapping['source']['column'])
+                handling = extras_handling(mapping)
+                if handling and handling.get('link_key'):
+                    needed.add(handling['link_key'])
+            if 'plan' in task.spec:
+                needed.update(task.spec['plan']['join']['left']['on'])
+            for key in task.inputs:
+                if key.startswith("loaded:bank1_"):
+                    columns.setdefault(key[len("loaded:"):], set()).update(needed)
+        return columns
+
+    def source_columns_list(self, key):
+        """Columns to read for a loaded_data key, or None to read all of them"""
+        columns = self.source_columns.get(key)
+        return sorted(columns) if columns is not None else None
+
     def generate_uuid(self, seed_string):
         """Generate deterministic UUID based on seed string"""
         return str(uuid.uuid5(uuid.NAMESPACE_DNS, str(seed_string)))
     
-    def normalize_phone(self, phone):
-        """Standardize phone number to E.164 format"""
-        if pd.isna(phone):
-            return phone
+    def generate_uuids(self, values, prefix='', cache=True):
+        """Generate deterministic UUIDs for a column, hashing each distinct seed once per run.
+        
+        Pass cache=False for seeds that are unique per row (e.g. transaction references)
+        so the run-wide cache does not grow with the number of rows.
+        """
+        codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=False)
+        seeds = [f"{prefix}{value}" for value in uniques]
+        
+        # Only the cache lookups and inserts hold the lock; hashing runs in parallel
+        keys = np.empty(len(uniques), dtype=object)
+        if cache:
+            with self.state_lock:
+                keys[:] = [self.uuid_cache.get(seed) for seed in seeds]
+        missing = [i for i, key in enumerate(keys) if key is None]
+        for i in missing:
+            keys[i] = self.generate_uuid(seeds[i])
             
-        phone_str = str(phone)
-        # Remove all non-digit characters
-        digits = re.sub(r'\D', '', phone_str)
-        
-        if len(digits) == 10:
-            return f"+1{digits}"  # Assume US/Canada
-        elif len(digits) == 11 and digits.startswith('1'):
-            return f"+{digits}"
-        elif len(digits) > 11:
-            return f"+{digits}"
-        else:
-            return phone_str  # Return original if can't standardize
+        with self.state_lock:
+            if cache:
+                self.uuid_cache.update((seeds[i], keys[i]) for i in missing)
+            self.uuid_stats['seeds_hashed'] += len(missing)
+            self.uuid_stats['rows'] += len(codes)
+        # Rows sharing a seed share the same string object
+        return keys.take(codes)
     
     def parse_date(self, date_str, output_format='%Y-%m-%d'):
         """Parse date string to standardized format"""
@@ -142,13 +422,7 @@ class BankDataMerger:
         date_str = str(date_str)
         
         # Try common date formats
-        formats = [
-            '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%Y/%m/%d',
-            '%m-%d-%Y', '%d-%m-%Y', '%Y.%m.%d', '%d.%m.%Y',
-            '%Y%m%d', '%d%m%Y', '%m%d%Y'
-        ]
-        
-        for fmt in formats:
+        for fmt in DATE_FORMATS:
             try:
                 parsed_date = datetime.strptime(date_str, fmt)
                 return parsed_date.strftime(output_format)
@@ -158,137 +432,275 @@ class BankDataMerger:
         # Return original if can't parse
         return date_str
     
-    def normalize_country_code(self, country):
-        """Convert country name to ISO 3166-1 alpha-3 code"""
-        if pd.isna(country):
-            return country
-            
-        country = str(country).upper().strip()
-        
-        # Simple country code mapping (in practice, use a comprehensive library)
-        country_mapping = {
-            'UNITED STATES': 'USA', 'US': 'USA', 'USA': 'USA', 'UNITED STATES OF AMERICA': 'USA',
-            'UNITED KINGDOM': 'GBR', 'UK': 'GBR', 'GREAT BRITAIN': 'GBR',
-            'CANADA': 'CAN', 'CA': 'CAN',
-            'GERMANY': 'DEU', 'DE': 'DEU',
-            'FRANCE': 'FRA', 'FR': 'FRA',
-            'AUSTRALIA': 'AUS', 'AU': 'AUS',
-            'JAPAN': 'JPN', 'JP': 'JPN',
-            'CHINA': 'CHN', 'CN': 'CHN',
-            'INDIA': 'IND', 'IN': 'IND'
-        }
+    def cast_column(self, values, params):
+        """Cast a column to decimal or integer, keeping values that cannot be converted"""
+        cast_type = params.get('type')
+        if cast_type not in ('decimal', 'integer'):
+            return values
+            
+        numeric = pd.to_numeric(values, errors='coerce')
+        converted = numeric.notna()
         
-        return country_mapping.get(country, country[:3].upper() if len(country) >= 3 else country)
+        if cast_type == 'decimal':
+            cast_values = numeric.round(params.get('scale', 2))
+        elif pd.api.types.is_integer_dtype(numeric):
+            cast_values = numeric.where(converted, 0).astype('int64')
+        else:
+            # int(float(value)) truncates toward zero; infinite and out-of-range
+            # values cannot be converted and keep their original value
+            numeric = numeric.astype('float64')
+            converted &= np.isfinite(numeric) & (numeric.abs() < 2.0 ** 63)
+            cast_values = np.trunc(numeric.where(converted, 0)).astype('int64')
+            
+        if converted.all():
+            return cast_values
+        return values.astype(object).where(~converted, cast_values.astype(object))
     
-    def normalize_currency_code(self, currency):
-        """Convert currency to ISO 4217 code"""
-        if pd.isna(currency):
-            return currency
-            
-        currency = str(currency).upper().strip()
-        
-        currency_mapping = {
-            'USD': 'USD', 'US$': 'USD', '$': 'USD', 'US DOLLAR': 'USD',
-            'EUR': 'EUR', 'EURO': 'EUR', '€': 'EUR',
-            'GBP': 'GBP', 'POUND': 'GBP', '£': 'GBP', 'BRITISH POUND': 'GBP',
-            'JPY': 'JPY', 'YEN': 'JPY', '¥': 'JPY',
-            'CAD': 'CAD', 'CA$': 'CAD', 'CANADIAN DOLLAR': 'CAD',
-            'AUD': 'AUD', 'AUSTRALIAN DOLLAR': 'AUD',
-            'INR': 'INR', 'RUPEE': 'INR', '₹': 'INR'
+    def infer_date_formats(self, text):
+        """Work out the dominant date format(s) of a column from a sample of its values"""
+        if len(text) > DATE_SAMPLE_SIZE:
+            text = text.sample(DATE_SAMPLE_SIZE, random_state=0)
+            
+        matches = {
+            fmt: pd.to_datetime(text, format=fmt, errors='coerce').notna().to_numpy()
+            for fmt in DATE_FORMATS
         }
         
-        return currency_mapping.get(currency, currency)
+        # Greedily pick the format covering the most still-unmatched sample values;
+        # ties go to the earlier entry in DATE_FORMATS
+        formats = []
+        uncovered = np.ones(len(text), dtype=bool)
+        while uncovered.any():
+            best_fmt, best_count = None, 0
+            for fmt in DATE_FORMATS:
+                count = int((matches[fmt] & uncovered).sum())
+                if count > best_count:
+                    best_fmt, best_count = fmt, count
+            if best_fmt is None:
+                break
+            formats.append(best_fmt)
+            uncovered &= ~matches[best_fmt]
+            
+        return formats
     
-    def normalize_string(self, text, case_type='proper'):
-        """Normalize string case and trim"""
-        if pd.isna(text):
-            return text
-            
-        text = str(text).strip()
-        
-        if case_type == 'upper':
-            return text.upper()
-        elif case_type == 'lower':
-            return text.lower()
-        elif case_type == 'proper':
-            return text.title()
+    def parse_date_column(self, values, output_format='%Y-%m-%d', column_label=None):
+        """Parse a column of dates to a standardized format"""
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return values.dt.strftime(output_format)
+            
+        result = values.astype(object)
+        
+        # datetime/date objects mixed into object columns only need formatting
+        is_datelike = values.map(lambda v: hasattr(v, 'strftime')).to_numpy(dtype=bool)
+        if is_datelike.any():
+            result[is_datelike] = values[is_datelike].map(lambda v: v.strftime(output_format))
+            
+        text = values[~is_datelike].astype(str)
+        formatted = text.to_numpy(dtype=object)
+        remaining = np.ones(len(text), dtype=bool)
+        
+        if self.date_parsing == 'infer':
+            formats = self.infer_date_formats(text)
         else:
-            return text
+            formats = DATE_FORMATS
+            
+        # Try the candidate formats, each one only on the rows still unparsed
+        for fmt in formats:
+            if not remaining.any():
+                break
+            parsed = pd.to_datetime(text[remaining], format=fmt, errors='coerce')
+            hit = parsed.notna().to_numpy()
+            rows = np.flatnonzero(remaining)[hit]
+            formatted[rows] = parsed[hit].dt.strftime(output_format).to_numpy()
+            remaining[rows] = False
+            
+        # Values the vectorized pass could not parse (formats the sample did not
+        # anticipate, or dates outside the datetime64[ns] range such as 12/31/9999)
+        # fall back to the per-value parser; rows that match no format keep their original text
+        fallback_rows = int(remaining.sum())
+        if fallback_rows:
+            formatted[remaining] = text[remaining].map(
+                lambda x: self.parse_date(x, output_format)
+            ).to_numpy(dtype=object)
+            
+        result[~is_datelike] = formatted
+        
+        if column_label is not None:
+            # Columns parsed in several chunks accumulate into one entry
+            with self.state_lock:
+                report = self.date_format_report.setdefault(
+                    column_label, {'formats': [], 'rows': 0, 'fallback_rows': 0}
+                )
+                if self.date_parsing == 'infer':
+                    report['formats'].extend(fmt for fmt in formats if fmt not in report['formats'])
+                report['rows'] += len(values)
+                report['fallback_rows'] += fallback_rows
+        return result
+    
+    def normalize_country_column(self, values):
+        """Convert a column of country names to ISO 3166-1 alpha-3 codes"""
+        country = values.astype(str).str.upper().str.strip()
+        fallback = country.where(country.str.len() < 3, country.str[:3])
+        known = country.isin(COUNTRY_CODE_MAPPING.keys())
+        return fallback.where(~known, country.map(COUNTRY_CODE_MAPPING))
     
-    def cast_to_decimal(self, value, precision=15, scale=2):
-        """Cast value to decimal with specified precision"""
-        if pd.isna(value):
-            return value
+    def normalize_currency_column(self, values):
+        """Convert a column of currencies to ISO 4217 codes"""
+        currency = values.astype(str).str.upper().str.strip()
+        known = currency.isin(CURRENCY_CODE_MAPPING.keys())
+        return currency.where(~known, currency.map(CURRENCY_CODE_MAPPING))
+    
+    def normalize_string_column(self, values, params):
+        """Normalize string case and trim a column, then apply any value mapping"""
+        case = params.get('case', 'proper')
+        mapping = params.get('mapping', {})
+        
+        text = values.astype(str).str.strip()
+        
+        if case == 'upper':
+            result = text.str.upper()
+        elif case == 'lower':
+            result = text.str.lower()
+        elif case == 'proper':
+            result = text.str.title()
+        else:
+            result = text
             
-        try:
-            # Round to specified decimal places
-            return round(float(value), scale)
-        except (ValueError, TypeError):
-            return value
+        # Apply value mapping if specified
+        if mapping and isinstance(mapping, dict):
+            # The normalized value takes precedence over the original value
+            result_upper = result.str.upper()
+            original_upper = values.astype(str).str.upper()
+            result = result.where(~original_upper.isin(mapping.keys()), original_upper.map(mapping))
+            result = result.where(~result_upper.isin(mapping.keys()), result_upper.map(mapping))
+        elif mapping == 'iso_3166_alpha3':
+            result = self.normalize_country_column(result)
+        elif mapping == 'iso_4217':
+            result = self.normalize_currency_column(result)
+            
+        return result
+    
+    def normalize_phone_column(self, values):
+        """Standardize a column of phone numbers to E.164 format"""
+        phone = values.astype(str)
+        # Remove all non-digit characters
+        digits = phone.str.replace(r'\D', '', regex=True)
+        length = digits.str.len()
+        
+        result = phone.where(length != 10, '+1' + digits)  # Assume US/Canada
+        international = ((length == 11) & digits.str.startswith('1')) | (length > 11)
+        return result.where(~international, '+' + digits)
     
-    def apply_transformation(self, value, transform_type, params):
-        """Apply transformation to a value based on transform type and parameters"""
-        if pd.isna(value):
-            return value
+    def resolve_transform(self, transform_type, params):
+        """Column function of a transform, as apply(values, column_label), or None for a no-op"""
+        if transform_type == 'cast':
+            return lambda values, column_label=None: self.cast_column(values, params)
             
-        try:
-            if transform_type == 'identity':
-                return value
-                
-            elif transform_type == 'cast':
-                if params.get('type') == 'decimal':
-                    return self.cast_to_decimal(value, params.get('precision', 15), params.get('scale', 2))
-                elif params.get('type') == 'integer':
-                    return int(float(value)) if value else value
-                    
-            elif transform_type == 'parse_date':
-                return self.parse_date(value)
-                
-            elif transform_type == 'string_normalize':
-                case = params.get('case', 'proper')
-                mapping = params.get('mapping', {})
+        elif transform_type == 'parse_date':
+            return lambda values, column_label=None: self.parse_date_column(values, column_label=column_label)
+            
+        elif transform_type == 'string_normalize':
+            return lambda values, column_label=None: self.normalize_string_column(values, params)
+            
+        elif transform_type == 'custom':
+            rule = params.get('rule', '')
+            if 'phone' in rule.lower() or 'E.164' in rule:
+                return lambda values, column_label=None: self.normalize_phone_column(values)
+            elif 'UUID' in rule:
+                return lambda values, column_label=None: pd.Series(self.generate_uuids(values), index=values.index)
                 
-                # Apply case normalization
-                result = self.normalize_string(value, case)
+        return None
+    
+    def transform_unique_values(self, values, codes, uniques, transform):
+        """Transform only the distinct values of a column and broadcast them back through the codes"""
+        if len(uniques) > FACTORIZE_MEMO_SIZE:
+            # More distinct values than the memo holds would only evict each other
+            transformed = transform.apply(pd.Series(uniques, dtype=object))
+            if transformed is None:
+                return None
+            with self.state_lock:
+                self.factorize_stats['columns'] += 1
+                self.factorize_stats['rows'] += len(values)
+                self.factorize_stats['unique_values'] += len(uniques)
+            return pd.Series(transformed.to_numpy(dtype=object).take(codes), index=values.index)
+        
+        # The type is part of the key so that 1, 1.0 and True stay distinct
+        transform_key = transform.key
+        memo_keys = [(transform_key, type(value), value) for value in uniques]
+        
+        # Only the memo lookups and inserts hold the lock; transforming runs in parallel
+        unique_results = np.empty(len(uniques), dtype=object)
+        missing = []
+        with self.state_lock:
+            memo = self.transform_memo
+            for i, memo_key in enumerate(memo_keys):
+                if memo_key in memo:
+                    memo.move_to_end(memo_key)
+                    unique_results[i] = memo[memo_key]
+                else:
+                    missing.append(i)
                 
-                # Apply value mapping if specified
-                if mapping and isinstance(mapping, dict):
-                    if result.upper() in mapping:
-                        return mapping[result.upper()]
-                    # Also check original value
-                    if str(value).upper() in mapping:
-                        return mapping[str(value).upper()]
-                elif mapping == 'iso_3166_alpha3':
-                    return self.normalize_country_code(result)
-                elif mapping == 'iso_4217':
-                    return self.normalize_currency_code(result)
-                    
-                return result
+        if missing:
+            transformed = transform.apply(pd.Series(uniques[missing], dtype=object))
+            if transformed is None:
+                return None
+            unique_results[missing] = transformed.to_numpy(dtype=object)
+        new_entries = [(memo_keys[i], unique_results[i]) for i in missing]
+            
+        with self.state_lock:
+            self.transform_memo.update(new_entries)
+            while len(self.transform_memo) > FACTORIZE_MEMO_SIZE:
+                self.transform_memo.popitem(last=False)
                 
-            elif transform_type == 'custom':
-                rule = params.get('rule', '')
-                if 'phone' in rule.lower() or 'E.164' in rule:
-                    return self.normalize_phone(value)
-                elif 'UUID' in rule:
-                    return self.generate_uuid(value)
-                    
-            return value
+            self.factorize_stats['columns'] += 1
+            self.factorize_stats['rows'] += len(values)
+            self.factorize_stats['unique_values'] += len(uniques)
+            self.factorize_stats['memo_hits'] += len(uniques) - len(missing)
+        
+        return pd.Series(unique_results.take(codes), index=values.index)
+    
+    def transform_column(self, series, transform, column_label=None):
+        """Apply a compiled mapping transform to a whole column using vectorized operations"""
+        if transform.apply is None:
+            return series
             
+        mask = series.notna().to_numpy()
+        if not mask.any():
+            return series
+            
+        values = series[mask]
+        
+        try:
+            # Date parsing infers formats per column, so its results are not shared
+            if transform.type != 'parse_date':
+                codes, uniques = pd.factorize(values)
+                if len(uniques) <= FACTORIZE_MAX_RATIO * len(values):
+                    transformed = self.transform_unique_values(values, codes, uniques, transform)
+                else:
+                    transformed = transform.apply(values)
+            else:
+                transformed = transform.apply(values, column_label or series.name)
+                
         except Exception as e:
-            print(f"Warning: Transformation failed for value {value}: {e}")
-            return value
+            print(f"Warning: Transformation failed for column {series.name}: {e}")
+            return series
+            
+        if transformed is None:
+            return series
+            
+        # Null cells are passed through untouched
+        result = series.astype(object)
+        result[mask] = transformed.to_numpy(dtype=object)
+        return result.infer_objects()
 
     def get_mappings_for_table(self, target_table):
         """Get all mappings for a specific target table"""
-        if 'mappings' not in self.mapping_data:
-            return []
-        return [m for m in self.mapping_data['mappings'] 
-                if m['target']['table'] == target_table]
+        return self.mapping_spec.for_target_table(target_table)
 
     def get_output_plans(self):
         """Get output plans from JSON or generate default ones"""
-        if 'output_plans' in self.mapping_data:
-            return self.mapping_data['output_plans']
+        if self.mapping_spec.output_plans is not None:
+            return self.mapping_spec.output_plans
         else:
             # Generate default output plans based on available tables
             return self.generate_default_output_plans()
@@ -311,8 +723,7 @@ class BankDataMerger:
                     "strategy": "prefer_non_null",
                     "tie_breaker": "creationDate"
                 },
-                "use_mappings": [m['id'] for m in self.mapping_data.get('mappings', []) 
-                               if m['target']['table'] == 'Customer']
+                "use_mappings": [m['id'] for m in self.get_mappings_for_table('Customer')]
             })
         
         # Deposit Accounts (from CurSav + Fixed Term)
@@ -329,8 +740,7 @@ class BankDataMerger:
                     "strategy": "prefer_non_null", 
                     "tie_breaker": "creationDate"
                 },
-                "use_mappings": [m['id'] for m in self.mapping_data.get('mappings', [])
-                               if m['target']['table'] == 'Deposit Accounts']
+                "use_mappings": [m['id'] for m in self.get_mappings_for_table('Deposit Accounts')]
             })
         
         # Loan Accounts
@@ -347,8 +757,7 @@ class BankDataMerger:
                     "strategy": "prefer_non_null",
                     "tie_breaker": "creationDate"
                 },
-                "use_mappings": [m['id'] for m in self.mapping_data.get('mappings', [])
-                               if m['target']['table'] == 'Loan Accounts']
+                "use_mappings": [m['id'] for m in self.get_mappings_for_table('Loan Accounts')]
             })
             
         return plans
@@ -368,8 +777,7 @@ class BankDataMerger:
         
         # Get mappings for this table
         mapping_ids = plan.get('use_mappings', [])
-        table_mappings = [m for m in self.mapping_data.get('mappings', []) 
-                         if m['id'] in mapping_ids]
+        table_mappings = self.mapping_spec.select(mapping_ids)
         
         # Transform left (Bank1) data
         left_transformed = pd.DataFrame()
@@ -378,19 +786,24 @@ class BankDataMerger:
             target_col = mapping['target']['column']
             
             if source_col in left_data.columns:
-                transformed_values = left_data[source_col].apply(
-                    lambda x: self.apply_transformation(x, mapping['transform']['type'], mapping['transform']['params'])
+                transform = self.mapping_spec.transform(mapping)
+                transformed_values = self.transform_column(
+                    left_data[source_col], transform, f"{left_table}.{source_col}"
                 )
                 left_transformed[target_col] = transformed_values
                 
                 # Handle UUID generation for encodedKey
-                if target_col == 'encodedKey' and mapping['transform']['type'] == 'custom':
+                if target_col == 'encodedKey' and transform.type == 'custom':
                     if 'customerId' in left_data.columns:
-                        left_transformed[target_col] = left_data['customerId'].apply(self.generate_uuid)
+                        left_transformed[target_col] = self.generate_uuids(left_data['customerId'])
                     elif 'accountId' in left_data.columns:
-                        left_transformed[target_col] = left_data['accountId'].apply(
-                            lambda x: self.generate_uuid(f"{table_name.lower()}_{x}")
-                        )
+                        left_transformed[target_col] = self.generate_uuids(left_data['accountId'], f"{table_name.lower()}_")
+        
+        # Join keys are read before missing target columns are added as empty placeholders
+        left_on = join_config['left']['on']
+        right_on = join_config['right']['on']
+        left_keys = [self.resolve_left_join_key(key, left_data, left_transformed, table_mappings)
+                     for key in left_on] if not left_transformed.empty else []
         
         # Ensure all target columns are present
         if not right_data.empty:
@@ -400,58 +813,83 @@ class BankDataMerger:
         
         # Perform the join
         join_type = join_config['type']
-        left_on = join_config['left']['on']
-        right_on = join_config['right']['on']
         
         if not left_transformed.empty and not right_data.empty and left_on and right_on:
-            if join_type == 'full_outer':
-                merged_data = pd.merge(
-                    left_transformed, 
-                    right_data, 
-                    left_on=left_on[0],
-                    right_on=right_on[0],
-                    how='outer', 
-                    suffixes=('_bank1', '_bank2')
-                )
-                
-                # Resolve conflicts according to dedupe strategy
-                dedupe_config = plan['dedupe']
-                for col in right_data.columns:
-                    bank1_col = f"{col}_bank1"
-                    bank2_col = f"{col}_bank2"
-                    if bank1_col in merged_data.columns and bank2_col in merged_data.columns:
-                        if dedupe_config['strategy'] == 'prefer_non_null':
-                            merged_data[col] = merged_data[bank2_col].combine_first(merged_data[bank1_col])
-                        elif dedupe_config['strategy'] == 'prefer_right_non_null':
-                            merged_data[col] = merged_data[bank2_col].combine_first(merged_data[bank1_col])
-                
-                # Keep only resolved columns
-                final_columns = [col for col in right_data.columns if col in merged_data.columns]
-                merged_data = merged_data[final_columns]
-            else:
-                # For other join types, use left transformed as base
-                merged_data = left_transformed
+            missing = [key for key, values in zip(left_on, left_keys) if values is None]
+            missing += [key for key in right_on if key not in right_data.columns]
+            if missing:
+                raise ValueError(f"Join keys of {table_name} not found: {', '.join(missing)}")
+            
+            merged_data = join_frames(left_transformed, right_data, left_keys,
+                                      [right_data[key] for key in right_on], join_type)
+            
+            # Resolve conflicts according to dedupe strategy
+            dedupe_config = plan.get('dedupe', {})
+            for col in right_data.columns:
+                bank1_col = f"{col}_bank1"
+                bank2_col = f"{col}_bank2"
+                if bank1_col in merged_data.columns and bank2_col in merged_data.columns:
+                    if dedupe_config.get('strategy') in ('prefer_non_null', 'prefer_right_non_null'):
+                        resolved = merged_data[bank2_col].combine_first(merged_data[bank1_col])
+                    else:
+                        resolved = merged_data[bank1_col].combine_first(merged_data[bank2_col])
+                    merged_data[col] = restore_integer_dtype(resolved, left_transformed[col].dtype,
+                                                             right_data[col].dtype)
+            
+            # Keep only resolved columns
+            final_columns = [col for col in right_data.columns if col in merged_data.columns]
+            merged_data = merged_data[final_columns + [SIDE_COLUMN]]
         elif not left_transformed.empty:
             merged_data = left_transformed
         else:
             merged_data = right_data
         
+        dedupe_config = plan.get('dedupe')
+        if dedupe_config and dedupe_config.get('keys'):
+            merged_data, removed = dedupe_frame(merged_data, dedupe_config['keys'],
+                                                dedupe_config.get('strategy', 'prefer_non_null'),
+                                                dedupe_config.get('tie_breaker'))
+            if removed:
+                print(f"  ✓ {table_name}: merged {removed} duplicate records on {', '.join(dedupe_config['keys'])}")
+        merged_data = merged_data.drop(columns=SIDE_COLUMN, errors='ignore')
+        
         self.merged_data[table_name] = merged_data
         print(f"✓ {table_name} processed: {len(merged_data)} records")
 
-    def process_normalized_tables(self):
-        """Process normalized tables (Addresses, Identifications)"""
-        print("Processing normalized tables...")
+    def resolve_left_join_key(self, key, left_data, left_transformed, table_mappings):
+        """
+        Values of a left join key, which plans name either by its target column
+        or by its Bank1 source column. Returns None if the key is neither.
+        """
+        if key in left_transformed.columns:
+            return left_transformed[key]
+        for mapping in table_mappings:
+            if mapping['source']['column'] == key and mapping['target']['column'] in left_transformed.columns:
+                return left_transformed[mapping['target']['column']]
+        if key in left_data.columns:
+            return left_data[key]
+        return None
+
+    def normalized_table_specs(self):
+        """(target table, source table, foreign key) of the normalized tables to build"""
+        specs = []
         
         # Process Addresses if mappings exist
         address_mappings = self.get_mappings_for_table('Addresses')
         if address_mappings and 'Customer' in self.bank1_files:
-            self.process_normalized_table('Addresses', 'Customer', 'parentKey')
+            specs.append(('Addresses', 'Customer', 'parentKey'))
         
         # Process Identifications if mappings exist  
         id_mappings = self.get_mappings_for_table('Identifications')
         if id_mappings and 'Customer' in self.bank1_files:
-            self.process_normalized_table('Identifications', 'Customer', 'clientKey')
+            specs.append(('Identifications', 'Customer', 'clientKey'))
+        return specs
+
+    def process_normalized_tables(self):
+        """Process normalized tables (Addresses, Identifications)"""
+        print("Processing normalized tables...")
+        for target_table, source_table, foreign_key in self.normalized_table_specs():
+            self.process_normalized_table(target_table, source_table, foreign_key)
 
     def process_normalized_table(self, target_table, source_table, foreign_key):
         """Process a normalized table that extracts data from a source table"""
@@ -475,17 +913,15 @@ class BankDataMerger:
             target_col = mapping['target']['column']
             
             if source_col in bank1_source.columns:
-                transformed_values = bank1_source[source_col].apply(
-                    lambda x: self.apply_transformation(x, mapping['transform']['type'], mapping['transform']['params'])
+                transformed_values = self.transform_column(
+                    bank1_source[source_col], self.mapping_spec.transform(mapping), f"{source_table}.{source_col}"
                 )
                 bank1_normalized[target_col] = transformed_values
         
         # Add keys
         if 'customerId' in bank1_source.columns:
-            bank1_normalized['encodedKey'] = bank1_source['customerId'].apply(
-                lambda x: self.generate_uuid(f"{target_table.lower()}_{x}")
-            )
-            bank1_normalized[foreign_key] = bank1_source['customerId'].apply(self.generate_uuid)
+            bank1_normalized['encodedKey'] = self.generate_uuids(bank1_source['customerId'], f"{target_table.lower()}_")
+            bank1_normalized[foreign_key] = self.generate_uuids(bank1_source['customerId'])
         
         # Ensure all Bank2 columns are present
         if not bank2_target.empty:
@@ -512,199 +948,279 @@ class BankDataMerger:
         if loan_tx_mappings:
             self.process_loan_transactions()
 
-    def process_deposit_transactions(self):
-        """Process deposit transactions from CurSav and Fixed Term"""
-        bank1_cursav_tx = self.loaded_data.get('bank1_CurSav Account Transactions', pd.DataFrame())
-        bank1_fixedterm_tx = self.loaded_data.get('bank1_Fixed Term Account Transactions', pd.DataFrame())
-        bank2_deposit_tx = self.loaded_data.get('bank2_Deposit Account Transactions', pd.DataFrame())
-        
-        # Transform Bank1 transactions
-        bank1_transformed_tx = pd.DataFrame()
-        
-        deposit_tx_mappings = self.get_mappings_for_table('Deposit Account Transactions')
-        
-        # Process CurSav transactions
-        if not bank1_cursav_tx.empty:
-            cursav_data = pd.DataFrame()
-            for mapping in deposit_tx_mappings:
-                source_col = mapping['source']['column']
-                target_col = mapping['target']['column']
-                
-                if source_col in bank1_cursav_tx.columns:
-                    transformed_values = bank1_cursav_tx[source_col].apply(
-                        lambda x: self.apply_transformation(x, mapping['transform']['type'], mapping['transform']['params'])
-                    )
-                    cursav_data[target_col] = transformed_values
-            
-            # Add keys
-            if 'transactionReference' in bank1_cursav_tx.columns:
-                cursav_data['encodedKey'] = bank1_cursav_tx['transactionReference'].apply(
-                    lambda x: self.generate_uuid(f"deposit_tx_{x}")
-                )
-            if 'accountId' in bank1_cursav_tx.columns:
-                cursav_data['parentAccountKey'] = bank1_cursav_tx['accountId'].apply(
-                    lambda x: self.generate_uuid(f"deposit_{x}")
-                )
+    def transform_transactions(self, source_tx, tx_mappings, source_table, key_prefix):
+        """Transform Bank1 transactions to the Bank2 layout and add their keys"""
+        tx_data = pd.DataFrame()
+        for mapping in tx_mappings:
+            source_col = mapping['source']['column']
+            target_col = mapping['target']['column']
             
-            bank1_transformed_tx = pd.concat([bank1_transformed_tx, cursav_data], ignore_index=True)
-        
-        # Process Fixed Term transactions
-        if not bank1_fixedterm_tx.empty:
-            fixedterm_data = pd.DataFrame()
-            for mapping in deposit_tx_mappings:
-                source_col = mapping['source']['column']
-                target_col = mapping['target']['column']
-                
-                if source_col in bank1_fixedterm_tx.columns:
-                    transformed_values = bank1_fixedterm_tx[source_col].apply(
-                        lambda x: self.apply_transformation(x, mapping['transform']['type'], mapping['transform']['params'])
-                    )
-                    fixedterm_data[target_col] = transformed_values
-            
-            # Add keys
-            if 'transactionReference' in bank1_fixedterm_tx.columns:
-                fixedterm_data['encodedKey'] = bank1_fixedterm_tx['transactionReference'].apply(
-                    lambda x: self.generate_uuid(f"deposit_tx_{x}")
+            if source_col in source_tx.columns:
+                transformed_values = self.transform_column(
+                    source_tx[source_col], self.mapping_spec.transform(mapping), f"{source_table}.{source_col}"
                 )
-            if 'accountId' in bank1_fixedterm_tx.columns:
-                fixedterm_data['parentAccountKey'] = bank1_fixedterm_tx['accountId'].apply(
-                    lambda x: self.generate_uuid(f"deposit_{x}")
-                )
-            
-            bank1_transformed_tx = pd.concat([bank1_transformed_tx, fixedterm_data], ignore_index=True)
+                tx_data[target_col] = transformed_values
+        
+        # Add keys
+        if 'transactionReference' in source_tx.columns:
+            tx_data['encodedKey'] = self.generate_uuids(
+                source_tx['transactionReference'], f"{key_prefix}_tx_", cache=False
+            )
+        if 'accountId' in source_tx.columns:
+            tx_data['parentAccountKey'] = self.generate_uuids(source_tx['accountId'], f"{key_prefix}_")
         
+        return tx_data
+    
+    def combine_transactions(self, output_table, bank2_tx, bank1_transformed_tx):
+        """Align transformed Bank1 transactions with Bank2 and store the merged table"""
         # Ensure all Bank2 columns are present
-        if not bank2_deposit_tx.empty:
-            for col in bank2_deposit_tx.columns:
+        if not bank2_tx.empty:
+            for col in bank2_tx.columns:
                 if col not in bank1_transformed_tx.columns:
                     bank1_transformed_tx[col] = None
         
         # Merge with Bank2 transactions
         if not bank1_transformed_tx.empty:
-            merged_tx = pd.concat([bank2_deposit_tx, bank1_transformed_tx], ignore_index=True)
+            merged_tx = pd.concat([bank2_tx, bank1_transformed_tx], ignore_index=True)
         else:
-            merged_tx = bank2_deposit_tx
+            merged_tx = bank2_tx
+        
+        self.merged_data[output_table] = merged_tx
+        return merged_tx
+    
+    def stream_transactions(self, output_table, source_tables, bank2_tx, key_prefix):
+        """Stream Bank1 transactions chunk by chunk straight into the merged CSV output"""
+        tx_mappings = self.get_mappings_for_table(output_table)
+        
+        # Streamed CSVs are read in chunks; any other source was loaded whole
+        sources = []
+        for source_table in source_tables:
+            filename = self.bank1_files.get(source_table)
+            file_path = os.path.join(self.bank1_dir, filename) if filename else None
+            if filename and self.is_streamed_source("bank1", source_table, filename):
+                if os.path.exists(file_path):
+                    sources.append((source_table, file_path))
+                else:
+                    print(f"  ✗ File not found: {file_path}")
+            elif not self.loaded_data.get(f"bank1_{source_table}", pd.DataFrame()).empty:
+                sources.append((source_table, None))
         
-        self.merged_data['Deposit Account Transactions'] = merged_tx
+        def read_chunks(source_table, file_path):
+            if file_path is None:
+                yield self.loaded_data[f"bank1_{source_table}"]
+                return
+            usecols = source_usecols(self.source_columns.get(f"bank1_{source_table}"))
+            for chunk in pd.read_csv(file_path, chunksize=self.stream_chunk_size, usecols=usecols):
+                yield chunk.reset_index(drop=True)
+        
+        # Fix the output columns from the headers before any rows are written:
+        # Bank2 columns first, then mapped or key columns only Bank1 provides
+        columns = list(bank2_tx.columns)
+        for source_table, file_path in sources:
+            if file_path is None:
+                header = self.loaded_data[f"bank1_{source_table}"].columns
+            else:
+                header = pd.read_csv(file_path, nrows=0,
+                                     usecols=source_usecols(self.source_columns.get(f"bank1_{source_table}"))).columns
+            new_columns = [m['target']['column'] for m in tx_mappings if m['source']['column'] in header]
+            if 'transactionReference' in header:
+                new_columns.append('encodedKey')
+            if 'accountId' in header:
+                new_columns.append('parentAccountKey')
+            columns.extend(col for col in dict.fromkeys(new_columns) if col not in columns)
+        
+        clean_name = output_table.replace(' ', '_').replace('/', '_')
+        output_path = self.fresh_output_path(f"Merged_{clean_name}.csv")
+        
+        bank2_tx.reindex(columns=columns).to_csv(output_path, index=False)
+        records = len(bank2_tx)
+        for source_table, file_path in sources:
+            for chunk in read_chunks(source_table, file_path):
+                tx_data = self.transform_transactions(chunk, tx_mappings, source_table, key_prefix)
+                tx_data.reindex(columns=columns).to_csv(output_path, mode='a', header=False, index=False)
+                records += len(tx_data)
+        
+        self.streamed_tables[output_table] = {'path': output_path, 'records': records, 'columns': columns}
+        return records
+
+    def process_deposit_transactions(self):
+        """Process deposit transactions from CurSav and Fixed Term"""
+        source_tables = ['CurSav Account Transactions', 'Fixed Term Account Transactions']
+        bank2_deposit_tx = self.loaded_data.get('bank2_Deposit Account Transactions', pd.DataFrame())
+        
+        if self.stream_chunk_size:
+            records = self.stream_transactions('Deposit Account Transactions', source_tables, bank2_deposit_tx, "deposit")
+            print(f"✓ Deposit Transactions streamed: {records} records")
+            return
+        
+        # Transform Bank1 transactions
+        bank1_transformed_tx = pd.DataFrame()
+        
+        deposit_tx_mappings = self.get_mappings_for_table('Deposit Account Transactions')
+        
+        # Process CurSav and Fixed Term transactions
+        for source_table in source_tables:
+            bank1_tx = self.loaded_data.get(f"bank1_{source_table}", pd.DataFrame())
+            if not bank1_tx.empty:
+                tx_data = self.transform_transactions(bank1_tx, deposit_tx_mappings, source_table, "deposit")
+                bank1_transformed_tx = pd.concat([bank1_transformed_tx, tx_data], ignore_index=True)
+        
+        merged_tx = self.combine_transactions('Deposit Account Transactions', bank2_deposit_tx, bank1_transformed_tx)
         print(f"✓ Deposit Transactions processed: {len(merged_tx)} records")
 
     def process_loan_transactions(self):
         """Process loan transactions"""
-        bank1_loan_tx = self.loaded_data.get('bank1_Loan Account Transactions', pd.DataFrame())
         bank2_loan_tx = self.loaded_data.get('bank2_Loan Account Transactions', pd.DataFrame())
         
+        if self.stream_chunk_size:
+            records = self.stream_transactions('Loan Account Transactions', ['Loan Account Transactions'], bank2_loan_tx, "loan")
+            print(f"✓ Loan Transactions streamed: {records} records")
+            return
+        
+        bank1_loan_tx = self.loaded_data.get('bank1_Loan Account Transactions', pd.DataFrame())
         bank1_transformed_tx = pd.DataFrame()
         
         if not bank1_loan_tx.empty:
             loan_tx_mappings = self.get_mappings_for_table('Loan Account Transactions')
-            
-            for mapping in loan_tx_mappings:
-                source_col = mapping['source']['column']
-                target_col = mapping['target']['column']
-                
-                if source_col in bank1_loan_tx.columns:
-                    transformed_values = bank1_loan_tx[source_col].apply(
-                        lambda x: self.apply_transformation(x, mapping['transform']['type'], mapping['transform']['params'])
-                    )
-                    bank1_transformed_tx[target_col] = transformed_values
-            
-            # Add keys
-            if 'transactionReference' in bank1_loan_tx.columns:
-                bank1_transformed_tx['encodedKey'] = bank1_loan_tx['transactionReference'].apply(
-                    lambda x: self.generate_uuid(f"loan_tx_{x}")
-                )
-            if 'accountId' in bank1_loan_tx.columns:
-                bank1_transformed_tx['parentAccountKey'] = bank1_loan_tx['accountId'].apply(
-                    lambda x: self.generate_uuid(f"loan_{x}")
-                )
-        
-        # Ensure all Bank2 columns are present
-        if not bank2_loan_tx.empty:
-            for col in bank2_loan_tx.columns:
-                if col not in bank1_transformed_tx.columns:
-                    bank1_transformed_tx[col] = None
-        
-        # Merge with Bank2 transactions
-        if not bank1_transformed_tx.empty:
-            merged_tx = pd.concat([bank2_loan_tx, bank1_transformed_tx], ignore_index=True)
-        else:
-            merged_tx = bank2_loan_tx
+            bank1_transformed_tx = self.transform_transactions(
+                bank1_loan_tx, loan_tx_mappings, 'Loan Account Transactions', "loan"
+            )
         
-        self.merged_data['Loan Account Transactions'] = merged_tx
+        merged_tx = self.combine_transactions('Loan Account Transactions', bank2_loan_tx, bank1_transformed_tx)
         print(f"✓ Loan Transactions processed: {len(merged_tx)} records")
 
+    def extras_table_mappings(self):
+        """Mappings with extras_table handling, grouped by extras table"""
+        return dict(self.mapping_spec.extras_by_table)
+
     def create_extras_tables(self):
         """Create extras tables for stray fields based on JSON mapping"""
         print("Creating extras tables for stray fields...")
+        for target_table, mappings in self.extras_table_mappings().items():
+            self.create_extras_table(target_table, mappings)
+
+    def create_extras_table(self, target_table, mappings):
+        """Create one extras table from the stray fields mapped to it"""
+        print(f"Creating {target_table}...")
+        
+        # Determine source table from first mapping
+        source_table = mappings[0]['source']['table']
+        link_key = mappings[0]['extra_field_handling'].get('link_key')
         
-        if 'mappings' not in self.mapping_data:
+        filename = self.bank1_files.get(source_table)
+        if filename and self.is_streamed_source("bank1", source_table, filename):
+            file_path = os.path.join(self.bank1_dir, filename)
+            if not os.path.exists(file_path):
+                print(f"  ✗ File not found: {file_path}")
+                return
+            records = self.stream_extras_table(target_table, mappings, link_key, file_path)
+            print(f"✓ {target_table} streamed: {records} records")
             return
-            
-        # Find all mappings with extra_field_handling
-        extras_mappings = [m for m in self.mapping_data['mappings'] 
-                          if m.get('extra_field_handling')]
         
-        # Group by target table
-        extras_by_table = {}
-        for mapping in extras_mappings:
-            handling = mapping['extra_field_handling']
-            target_table = handling['target_table']
-            if target_table not in extras_by_table:
-                extras_by_table[target_table] = []
-            extras_by_table[target_table].append(mapping)
+        bank1_source = self.loaded_data.get(f"bank1_{source_table}", pd.DataFrame())
         
-        # Create each extras table
-        for target_table, mappings in extras_by_table.items():
-            print(f"Creating {target_table}...")
-            
-            # Determine source table from first mapping
-            source_table = mappings[0]['source']['table']
-            link_key = mappings[0]['extra_field_handling']['link_key']
-            
-            bank1_source = self.loaded_data.get(f"bank1_{source_table}", pd.DataFrame())
-            
-            if bank1_source.empty:
-                continue
-            
-            # Create extras table
-            extras_data = pd.DataFrame()
-            
-            # Add link key
-            if link_key in bank1_source.columns:
-                extras_data[link_key] = bank1_source[link_key]
-            
-            # Add stray fields
-            for mapping in mappings:
-                source_col = mapping['source']['column']
-                target_col = mapping['target']['column']
-                
-                if source_col in bank1_source.columns:
-                    extras_data[target_col] = bank1_source[source_col]
+        if bank1_source.empty:
+            return
+        
+        # Create extras table
+        extras_data = pd.DataFrame()
+        
+        # Add link key
+        if link_key in bank1_source.columns:
+            extras_data[link_key] = bank1_source[link_key]
+        
+        # Add stray fields
+        for mapping in mappings:
+            source_col = mapping['source']['column']
+            target_col = mapping['target']['column']
             
-            if len(extras_data.columns) > 1:  # More than just link key
-                self.merged_data[target_table] = extras_data
-                print(f"✓ {target_table} created: {len(extras_data)} records")
+            if source_col in bank1_source.columns:
+                extras_data[target_col] = bank1_source[source_col]
+        
+        if len(extras_data.columns) > 1:  # More than just link key
+            self.merged_data[target_table] = extras_data
+            print(f"✓ {target_table} created: {len(extras_data)} records")
 
+    def stream_extras_table(self, target_table, mappings, link_key, file_path):
+        """Stream the stray fields of a streamed Bank1 source chunk by chunk into the extras CSV"""
+        header = pd.read_csv(file_path, nrows=0).columns
+        columns = {link_key: link_key} if link_key in header else {}
+        for mapping in mappings:
+            if mapping['source']['column'] in header:
+                columns[mapping['source']['column']] = mapping['target']['column']
+        
+        # More than just the link key
+        if len(columns) <= 1:
+            return 0
+        
+        clean_name = target_table.replace(' ', '_').replace('/', '_')
+        output_path = self.fresh_output_path(f"Merged_{clean_name}.csv")
+        
+        records = 0
+        for chunk in pd.read_csv(file_path, chunksize=self.stream_chunk_size, usecols=list(columns)):
+            extras_data = chunk[list(columns)].rename(columns=columns)
+            extras_data.to_csv(output_path, mode='a', header=records == 0, index=False)
+            records += len(extras_data)
+        
+        self.streamed_tables[target_table] = {'path': output_path, 'records': records,
+                                              'columns': list(columns.values())}
+        return records
+    
     def save_merged_data(self):
         """Save all merged tables to output directory"""
         print(f"Saving merged data to {self.output_dir}...")
         
-        for table_name, data in self.merged_data.items():
-            if not data.empty:
-                # Clean table name for filename
-                clean_name = table_name.replace(' ', '_').replace('/', '_')
-                output_path = os.path.join(self.output_dir, f"Merged_{clean_name}.xlsx")
-                
-                try:
-                    # Save to Excel
-                    data.to_excel(output_path, index=False)
-                    print(f"  ✓ Saved {table_name}: {len(data)} records, {len(data.columns)} columns")
-                    
-                    # Also save as CSV for good measure
-                    csv_path = os.path.join(self.output_dir, f"Merged_{clean_name}.csv")
-                    data.to_csv(csv_path, index=False)
-                except Exception as e:
-                    print(f"  ✗ Error saving {table_name}: {str(e)}")
+        for table_name in list(self.merged_data):
+            self.save_table(table_name)
+        self.report_streamed_tables()
+
+    def fresh_output_path(self, filename):
+        """Path of an output file, unlinked first since it may be shared with a previous run"""
+        path = os.path.join(self.output_dir, filename)
+        if os.path.lexists(path):
+            os.remove(path)
+        return path
+
+    def save_table(self, table_name):
+        """
+        Save one merged table as Excel and CSV.
+        
+        Returns:
+            bool: False if the table could not be saved; it is then left out of
+            the fingerprint manifest so the next run rebuilds it
+        """
+        # Streamed tables were already written chunk by chunk
+        if table_name in self.streamed_tables:
+            return True
+        
+        # Clean table name for filename; outputs of a previous run sharing the
+        # directory are removed first so a failed save leaves none behind
+        clean_name = table_name.replace(' ', '_').replace('/', '_')
+        output_path = self.fresh_output_path(f"Merged_{clean_name}.xlsx")
+        csv_path = self.fresh_output_path(f"Merged_{clean_name}.csv")
+        
+        data = self.merged_data.get(table_name)
+        if data is None or data.empty:
+            return True
+        
+        try:
+            # Save to Excel
+            data.to_excel(output_path, index=False)
+            print(f"  ✓ Saved {table_name}: {len(data)} records, {len(data.columns)} columns")
+            
+            # Also save as CSV for good measure
+            data.to_csv(csv_path, index=False)
+            return True
+        except Exception as e:
+            print(f"  ✗ Error saving {table_name}: {str(e)}")
+            with self.state_lock:
+                self.unsaved_tables.add(table_name)
+            return False
+
+    def report_streamed_tables(self):
+        # Streamed tables were written chunk by chunk as CSV only
+        for table_name, streamed in self.streamed_tables.items():
+            print(f"  ✓ Streamed {table_name}: {streamed['records']} records, {len(streamed['columns'])} columns (CSV only)")
     
     def generate_documentation(self):
         """Generate documentation markdown file based on JSON mapping"""
@@ -737,6 +1253,12 @@ class BankDataMerger:
             else:
                 f.write("- Transformations applied according to mapping specifications\n")
             
+            if self.date_format_report:
+                f.write("\n### Date Formats:\n\n")
+                for column, report in self.date_format_report.items():
+                    formats = ', '.join(f"`{fmt}`" for fmt in report['formats']) if report['formats'] else 'sequential'
+                    f.write(f"- **{column}**: {formats} ({report['rows']} rows, {report['fallback_rows']} fallback)\n")
+            
             f.write("\n## Output Tables\n\n")
             for table_name, data in self.merged_data.items():
                 f.write(f"### {table_name}\n")
@@ -744,6 +1266,20 @@ class BankDataMerger:
                 f.write(f"- **Columns**: {len(data.columns)}\n")
                 if len(data.columns) > 0:
                     f.write(f"- **Columns**: {', '.join(list(data.columns)[:8])}{'...' if len(data.columns) > 8 else ''}\n\n")
+            for table_name, streamed in self.streamed_tables.items():
+                columns = streamed['columns']
+                f.write(f"### {table_name}\n")
+                f.write(f"- **Records**: {streamed['records']} (streamed, CSV only)\n")
+                f.write(f"- **Columns**: {len(columns)}\n")
+                if len(columns) > 0:
+                    f.write(f"- **Columns**: {', '.join(columns[:8])}{'...' if len(columns) > 8 else ''}\n\n")
+            for table_name, reused in self.reused_tables.items():
+                columns = reused['columns']
+                f.write(f"### {table_name}\n")
+                f.write(f"- **Records**: {reused['records']} (unchanged, reused from the previous run)\n")
+                f.write(f"- **Columns**: {len(columns)}\n")
+                if len(columns) > 0:
+                    f.write(f"- **Columns**: {', '.join(columns[:8])}{'...' if len(columns) > 8 else ''}\n\n")
             
             f.write("## Data Quality Notes\n\n")
             f.write("- All transformations applied according to mapping specification\n")
@@ -752,13 +1288,261 @@ class BankDataMerger:
             
             # Add mapping statistics
             f.write("\n## Mapping Statistics\n\n")
-            total_mappings = len(self.mapping_data.get('mappings', []))
+            total_mappings = len(self.mapping_spec.mappings)
             f.write(f"- **Total Mappings**: {total_mappings}\n")
-            f.write(f"- **Output Tables**: {len(self.merged_data)}\n")
-            f.write(f"- **Total Records**: {sum(len(data) for data in self.merged_data.values())}\n")
+            f.write(f"- **Output Tables**: {self.total_tables()}\n")
+            f.write(f"- **Total Records**: {self.total_records()}\n")
         
         print(f"✓ Documentation generated: {doc_path}")
     
+    def total_records(self):
+        """Count records across in-memory, streamed and reused output tables"""
+        return (sum(len(df) for df in self.merged_data.values())
+                + sum(streamed['records'] for streamed in self.streamed_tables.values())
+                + sum(reused['records'] for reused in self.reused_tables.values()))
+
+    def total_tables(self):
+        return len(self.merged_data) + len(self.streamed_tables) + len(self.reused_tables)
+
+    def print_date_format_report(self):
+        """Print the date format chosen for each parsed date column"""
+        if not self.date_format_report:
+            return
+            
+        print("Date formats by column:")
+        for column, report in self.date_format_report.items():
+            formats = ', '.join(report['formats']) if report['formats'] else 'sequential'
+            print(f"  {column}: {formats} ({report['rows']} rows, {report['fallback_rows']} fallback)")
+    
+    def print_factorize_report(self):
+        """Print how often low-cardinality columns reused already transformed values"""
+        stats = self.factorize_stats
+        if not stats['columns']:
+            return
+            
+        hit_rate = stats['memo_hits'] / stats['unique_values'] if stats['unique_values'] else 0
+        print(f"Factorized transforms: {stats['columns']} columns, {stats['rows']} rows, "
+              f"{stats['unique_values']} distinct values, memo hit rate {hit_rate:.1%}")
+    
+    def build_merge_tasks(self):
+        """
+        Compile the table work of a merge into tasks with the tables they read and write.
+        
+        Listed in the order the stages used to run one after another; link_tasks
+        derives the dependencies from that order.
+        """
+        tasks = []
+        
+        def table_task(name, stage, run, reads, writes, spec):
+            inputs = [f"loaded:{key}" for key in reads]
+            outputs = [f"table:{table}" for table in writes]
+            tasks.append(MergeTask(name, stage, run, inputs, outputs, spec))
+        
+        for plan in self.get_output_plans():
+            join_config = plan['join']
+            table_task(f"plan:{plan['output_table']}", 'plans',
+                       lambda plan=plan: self.process_table_with_plan(plan['output_table'], plan),
+                       [f"bank1_{join_config['left']['table']}", f"bank2_{join_config['right']['table']}"],
+                       [plan['output_table']],
+                       {'plan': plan, 'mappings': self.mapping_spec.select(plan.get('use_mappings', []))})
+        
+        for target_table, source_table, foreign_key in self.normalized_table_specs():
+            table_task(f"normalized:{target_table}", 'normalized',
+                       lambda args=(target_table, source_table, foreign_key): self.process_normalized_table(*args),
+                       [f"bank1_{source_table}", f"bank2_{target_table}"], [target_table],
+                       {'foreign_key': foreign_key, 'mappings': self.get_mappings_for_table(target_table)})
+        
+        if self.get_mappings_for_table('Deposit Account Transactions'):
+            table_task("transactions:Deposit Account Transactions", 'transactions', self.process_deposit_transactions,
+                       ["bank1_CurSav Account Transactions", "bank1_Fixed Term Account Transactions",
+                        "bank2_Deposit Account Transactions"], ['Deposit Account Transactions'],
+                       {'mappings': self.get_mappings_for_table('Deposit Account Transactions')})
+        if self.get_mappings_for_table('Loan Account Transactions'):
+            table_task("transactions:Loan Account Transactions", 'transactions', self.process_loan_transactions,
+                       ["bank1_Loan Account Transactions", "bank2_Loan Account Transactions"],
+                       ['Loan Account Transactions'],
+                       {'mappings': self.get_mappings_for_table('Loan Account Transactions')})
+        
+        for target_table, mappings in self.extras_table_mappings().items():
+            table_task(f"extras:{target_table}", 'extras',
+                       lambda args=(target_table, mappings): self.create_extras_table(*args),
+                       [f"bank1_{mappings[0]['source']['table']}"], [target_table], {'mappings': mappings})
+        
+        # Each table is saved as soon as the last task writing it is done
+        for table in self.task_output_tables(tasks):
+            tasks.append(MergeTask(f"save:{table}", 'save', lambda table=table: self.save_table(table),
+                                   inputs=[f"table:{table}"]))
+        
+        return tasks
+
+    @staticmethod
+    def task_output_tables(tasks):
+        """Tables written by the tasks, in the order a sequential run first writes them"""
+        return list(dict.fromkeys(key[len("table:"):] for task in tasks
+                                  for key in task.outputs if key.startswith("table:")))
+
+    def input_file_path(self, key):
+        """Source file behind a loaded_data key such as 'bank1_Customer'"""
+        bank, table_name = key.split('_', 1)
+        bank_dir, bank_files = ((self.bank1_dir, self.bank1_files) if bank == 'bank1'
+                                else (self.bank2_dir, self.bank2_files))
+        filename = bank_files.get(table_name)
+        return os.path.join(bank_dir, filename) if filename else None
+
+    def compute_table_fingerprints(self, tasks):
+        """Fingerprint each output table from its input files and the spec of every task writing it"""
+        settings = {'date_parsing': self.date_parsing, 'stream_chunk_size': self.stream_chunk_size}
+        parts = {}
+        for task in tasks:
+            if task.spec is None:
+                continue
+            files = {}
+            for key in task.inputs:
+                if key.startswith("loaded:"):
+                    file_path = self.input_file_path(key[len("loaded:"):])
+                    files[key] = file_fingerprint(file_path) if file_path else None
+            # Review fields such as confidence, rationale and status do not change the data
+            spec = {**task.spec, 'mappings': [{key: m.get(key) for key in MAPPING_DATA_FIELDS}
+                                              for m in task.spec.get('mappings', [])]}
+            for table in self.task_output_tables([task]):
+                parts.setdefault(table, []).append({'task': task.name, 'spec': spec, 'files': files})
+        return {table: fingerprint({'settings': settings, 'tasks': table_parts})
+                for table, table_parts in parts.items()}
+
+    def skip_unchanged_tables(self, tasks):
+        """
+        Reuse the previous run's output for tables whose fingerprint has not changed.
+        
+        Returns:
+            list: The tasks still to run
+        """
+        previous = load_manifest(self.previous_output_dir)
+        for table, table_fingerprint in self.table_fingerprints.items():
+            entry = previous.get(table)
+            if (entry and entry.get('fingerprint') == table_fingerprint
+                    and reuse_files(entry, self.previous_output_dir, self.output_dir)):
+                self.reused_tables[table] = entry
+        
+        if self.reused_tables:
+            print(f"✓ Reusing {len(self.reused_tables)} unchanged tables: {', '.join(self.reused_tables)}")
+        
+        def reused(task):
+            # Save tasks write no table but read the one they save
+            tables = self.task_output_tables([task]) or [key[len("table:"):] for key in task.inputs
+                                                         if key.startswith("table:")]
+            return all(table in self.reused_tables for table in tables)
+        
+        return [task for task in tasks if not reused(task)]
+
+    def save_table_fingerprints(self):
+        """Record the fingerprint, size and files of every output table next to the outputs"""
+        previous = load_manifest(self.previous_output_dir) if self.previous_output_dir == self.output_dir else {}
+        tables = {}
+        for table, table_fingerprint in self.table_fingerprints.items():
+            if table in self.reused_tables:
+                tables[table] = self.reused_tables[table]
+                continue
+            if table in self.unsaved_tables:
+                continue
+            clean_name = table.replace(' ', '_').replace('/', '_')
+            files = [name for name in (f"Merged_{clean_name}.xlsx", f"Merged_{clean_name}.csv")
+                     if os.path.exists(os.path.join(self.output_dir, name))]
+            if table in self.streamed_tables:
+                records, columns = self.streamed_tables[table]['records'], self.streamed_tables[table]['columns']
+            elif table in self.merged_data and files:
+                records, columns = len(self.merged_data[table]), list(self.merged_data[table].columns)
+            else:
+                records, columns, files = 0, [], []
+            tables[table] = {'fingerprint': table_fingerprint, 'records': records, 'columns': columns, 'files': files}
+        
+        # Outputs of tables this mapping no longer produces are stale
+        kept = {name for entry in tables.values() for name in entry['files']}
+        for table, entry in previous.items():
+            if table not in tables:
+                for name in entry.get('files', []):
+                    if name not in kept and os.path.exists(os.path.join(self.output_dir, name)):
+                        os.remove(os.path.join(self.output_dir, name))
+        
+        save_manifest(self.output_dir, tables)
+
+    def resume_from_checkpoint(self, tasks):
+        """
+        Restore the tables of tasks completed by an interrupted run with the same fingerprints.
+        
+        Returns:
+            list: The tasks still to run
+        """
+        if self.checkpoint is None:
+            return tasks
+        
+        completed = self.checkpoint.open(fingerprint(self.table_fingerprints))
+        self.resumed_tasks = {task.name: completed[task.name] for task in tasks if task.name in completed}
+        if not self.resumed_tasks:
+            return tasks
+        
+        self.merged_data.update(self.checkpoint.load_tables())
+        for entry in self.resumed_tasks.values():
+            self.streamed_tables.update(entry['streamed'])
+        self.date_format_report.update(self.checkpoint.date_format_report)
+        print(f"✓ Resuming from checkpoint: {len(self.resumed_tasks)} of {len(tasks)} tasks already completed")
+        return [task for task in tasks if task.name not in self.resumed_tasks]
+
+    def checkpoint_task(self, task):
+        """Checkpoint the tables a finished task wrote"""
+        tables = self.task_output_tables([task])
+        with self.state_lock:
+            date_format_report = copy.deepcopy(self.date_format_report)
+        saved = self.checkpoint.save_task(task,
+                                          {table: self.merged_data[table] for table in tables if table in self.merged_data},
+                                          {table: self.streamed_tables[table] for table in tables if table in self.streamed_tables},
+                                          date_format_report)
+        if not saved and self.checkpoint.enabled:
+            with self.state_lock:
+                self.checkpoint_failures.append(task.name)
+
+    def run_merge_tasks(self, tasks):
+        """Run the table tasks, independent ones in parallel, and record their timings"""
+        link_tasks(tasks)
+        if self.merge_workers > 1:
+            print(f"Running {len(tasks)} merge tasks with up to {self.merge_workers} workers...")
+        
+        def before_task(task):
+            self.check_cancelled()
+            if self.current_stage is None or MERGE_STAGES.index(task.stage) > MERGE_STAGES.index(self.current_stage):
+                self.start_stage(task.stage)
+        
+        run_tasks(tasks, self.merge_workers, before_task, self.checkpoint_task if self.checkpoint else None)
+        
+        # Tables finish in any order; keep them in the order a sequential run creates them
+        order = [table for table in self.task_output_tables(tasks) if table in self.merged_data]
+        self.merged_data = {table: self.merged_data[table] for table in dict.fromkeys(order + list(self.merged_data))}
+        
+        self.task_timings = {task.name: task.duration for task in tasks}
+        self.critical_path = critical_path(tasks)
+        self.report_streamed_tables()
+
+    def print_task_report(self):
+        """Print the slowest merge tasks and the critical path"""
+        if not self.task_timings:
+            return
+        print(f"Merge tasks: {len(self.task_timings)}, busy time {sum(self.task_timings.values()):.2f}s")
+        for name, duration in sorted(self.task_timings.items(), key=lambda item: item[1], reverse=True)[:5]:
+            print(f"  {name}: {duration:.2f}s")
+        length, path = self.critical_path
+        print(f"Critical path ({length:.2f}s): {' -> '.join(path)}")
+
+    def check_cancelled(self):
+        """Stop the merge if it has been cancelled"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise MergeCancelled("Merge cancelled")
+
+    def start_stage(self, stage):
+        """Report the start of a merge stage, unless the merge has been cancelled"""
+        self.check_cancelled()
+        self.current_stage = stage
+        if self.progress_callback:
+            self.progress_callback(stage, MERGE_STAGES.index(stage) + 1, len(MERGE_STAGES))
+
     def run_merge(self):
         """Execute the complete merge process following JSON recipe"""
         print("Starting Bank Data Merge Process...")
@@ -766,36 +1550,52 @@ class BankDataMerger:
         
         try:
             # Load the recipe
+            load_started = time.time()
+            self.start_stage('load')
             self.load_mapping_data()
-            self.load_bank_files()
             
-            # Process tables according to output_plans in JSON
-            output_plans = self.get_output_plans()
-            for plan in output_plans:
-                self.process_table_with_plan(plan['output_table'], plan)
+            # Output plans, normalized tables, transactions and extras tables,
+            # then saving each table, as a graph of table tasks
+            tasks = self.build_merge_tasks()
+            self.table_fingerprints = self.compute_table_fingerprints(tasks)
+            if self.incremental:
+                tasks = self.skip_unchanged_tables(tasks)
+            tasks = self.resume_from_checkpoint(tasks)
             
-            # Process normalized tables
-            self.process_normalized_tables()
-            
-            # Process transaction tables
-            self.process_transaction_tables()
-            
-            # Create extras tables
-            self.create_extras_tables()
-            
-            # Save results
-            self.save_merged_data()
+            # Only the files some remaining task reads are loaded, and of Bank1
+            # files only the columns those tasks use
+            self.source_columns = self.required_source_columns(tasks)
+            self.load_bank_files({key[len("loaded:"):] for task in tasks
+                                  for key in task.inputs if key.startswith("loaded:")})
+            if self.checkpoint:
+                self.checkpoint.record_stage('load', load_started, time.time())
+            self.run_merge_tasks(tasks)
             self.generate_documentation()
+            self.save_table_fingerprints()
+            if self.checkpoint:
+                self.checkpoint.complete()
             
             print("=" * 50)
             print("✓ Merge completed successfully!")
             print(f"Output location: {self.output_dir}")
             
             # Summary
-            total_records = sum(len(data) for data in self.merged_data.values())
-            print(f"Total records across all tables: {total_records}")
-            print(f"Total tables created: {len(self.merged_data)}")
+            print(f"Total records across all tables: {self.total_records()}")
+            print(f"Total tables created: {self.total_tables()}")
+            if self.reused_tables:
+                print(f"Tables reused unchanged: {len(self.reused_tables)}")
+            if self.resumed_tasks:
+                print(f"Tasks resumed from checkpoint: {len(self.resumed_tasks)}")
+            if self.checkpoint_failures:
+                print(f"Tasks not checkpointed: {', '.join(self.checkpoint_failures)}")
+            self.print_date_format_report()
+            self.print_factorize_report()
+            self.print_task_report()
+            print(f"Generated keys: {self.uuid_stats['rows']} rows, {self.uuid_stats['seeds_hashed']} distinct seeds hashed")
             
+        except MergeCancelled:
+            print("✗ Merge cancelled")
+            raise
         except Exception as e:
             print(f"✗ Merge failed: {str(e)}")
             import traceback
@@ -809,7 +1609,10 @@ if __name__ == "__main__":
     BANK1_DIR = "Bank 1 Data"
     BANK2_DIR = "Bank 2 Data" 
     OUTPUT_DIR = "Merged_Bank_Data"
+    CACHE_DIR = ".source_cache"  # Parsed source tables reused between runs
+    STREAM_CHUNK_SIZE = int(os.getenv("MERGE_STREAM_CHUNK_SIZE", 0)) or None  # Rows per chunk of streamed transaction CSVs
     
     # Create and run merger
-    merger = BankDataMerger(MAPPING_FILE, BANK1_DIR, BANK2_DIR, OUTPUT_DIR)
+    merger = BankDataMerger(MAPPING_FILE, BANK1_DIR, BANK2_DIR, OUTPUT_DIR, cache_dir=CACHE_DIR,
+                            stream_chunk_size=STREAM_CHUNK_SIZE)
     merger.run_merge()
\ No newline at end of file
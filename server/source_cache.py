@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - cache is simply disabled without pyarrow
+    feather = None
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """Compute the SHA-256 of a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SourceFileCache:
+    """
+    On-disk cache of parsed source tables stored as uncompressed Arrow (Feather)
+    files so they can be memory-mapped on reload.
+
+    Each source path has a small metadata record holding its size, mtime and
+    content hash. The parsed table itself is stored under its content hash, so
+    a file that is touched but unchanged still hits, and a file whose content
+    changes gets a new entry while the stale one is removed.
+
+    A table read with only some of its columns is stored under its content
+    hash and column list, and serves later lookups for any subset of those
+    columns.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.enabled = feather is not None
+        if self.enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _meta_path(self, file_path: str) -> str:
+        path_key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{path_key}.json")
+
+    def _data_path(self, digest: str, columns: Optional[List[str]] = None) -> str:
+        if columns is None:
+            return os.path.join(self.cache_dir, f"{digest}.arrow")
+        columns_key = hashlib.sha1(json.dumps(sorted(columns)).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.{columns_key}.arrow")
+
+    def _read_meta(self, file_path: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(file_path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, file_path: str, stat: os.stat_result, digest: str,
+                    columns: Optional[List[str]] = None) -> None:
+        meta = {
+            'path': os.path.abspath(file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest,
+            'columns': sorted(columns) if columns is not None else None
+        }
+        meta_path = self._meta_path(file_path)
+        tmp_path = f"{meta_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _remove_if_unreferenced(self, digest: str) -> None:
+        """Drop a stored table once no source path points at it any more."""
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, name), 'r', encoding='utf-8') as f:
+                    if json.load(f).get('sha256') == digest:
+                        return
+            except (OSError, ValueError):
+                continue
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(f"{digest}.") and name.endswith('.arrow'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def load(self, file_path: str, columns: Optional[List[str]] = None) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """
+        Look up a source file in the cache.
+
+        Args:
+            file_path: Source file
+            columns: Columns needed, or None for all of them
+
+        Returns:
+            tuple: (DataFrame or None on a miss, content hash of the file or None
+            if it was not needed)
+        """
+        if not self.enabled:
+            return None, None
+
+        stat = os.stat(file_path)
+        meta = self._read_meta(file_path)
+
+        # Unchanged size and mtime: trust the recorded content hash
+        if meta and meta['size'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            digest = meta['sha256']
+        else:
+            digest = file_sha256(file_path)
+            if meta and meta['sha256'] != digest:
+                self._write_meta(file_path, stat, digest)
+                self._remove_if_unreferenced(meta['sha256'])
+
+        # The stored table must hold every column needed
+        stored_columns = meta.get('columns') if meta and meta['sha256'] == digest else None
+        if stored_columns is not None and (columns is None or not set(columns) <= set(stored_columns)):
+            return None, digest
+
+        data_path = self._data_path(digest, stored_columns)
+        if not os.path.exists(data_path):
+            return None, digest
+
+        try:
+            table = feather.read_table(data_path, memory_map=True)
+            if columns is not None:
+                table = table.select([name for name in table.column_names if name in set(columns)])
+            df = table.to_pandas()
+        except Exception:
+            return None, digest
+
+        if not meta or meta['sha256'] != digest or meta['mtime_ns'] != stat.st_mtime_ns:
+            self._write_meta(file_path, stat, digest, stored_columns)
+        return df, digest
+
+    def store(self, file_path: str, df: pd.DataFrame, digest: Optional[str] = None,
+              columns: Optional[List[str]] = None) -> bool:
+        """
+        Store a parsed source table; returns False if it could not be cached.
+
+        Pass the columns it was read with when it was not read whole.
+        """
+        if not self.enabled:
+            return False
+
+        stat = os.stat(file_path)
+        digest = digest or file_sha256(file_path)
+        data_path = self._data_path(digest, columns)
+        tmp_path = f"{data_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            # Arrow needs string column names; mixed-type object columns will raise
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, data_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        previous = self._read_meta(file_path)
+        self._write_meta(file_path, stat, digest, columns)
+        if previous and previous['sha256'] != digest:
+            self._remove_if_unreferenced(previous['sha256'])
+        elif previous and previous.get('columns') != (sorted(columns) if columns is not None else None):
+            # Superseded by a read with other columns
+            previous_path = self._data_path(digest, previous.get('columns'))
+            if previous_path != data_path and os.path.exists(previous_path):
+                os.remove(previous_path)
+        return True
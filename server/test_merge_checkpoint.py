@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from merge_checkpoint import MergeCheckpoint
+from merge_dag import MergeTask
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def mixed_customers():
+    # A loosely typed source column: Excel ints alongside free-text ids
+    return pd.DataFrame({
+        'customerId': [101, 'C-102', 103, None],
+        'firstName': ['Ann', 'Bob', 'Cy', 'Di']
+    })
+
+
+def finished_task(name):
+    task = MergeTask(name, 'plan', lambda: None)
+    task.started_at, task.finished_at = 0.0, 0.1
+    return task
+
+
+def test_mixed_type_column_round_trips(tmp_path, mixed_customers):
+    checkpoint = MergeCheckpoint(str(tmp_path))
+    checkpoint.open('run')
+    assert checkpoint.save_task(finished_task('plan:Customer'), {'Customer': mixed_customers}, {}, {})
+
+    resumed = MergeCheckpoint(str(tmp_path))
+    assert 'plan:Customer' in resumed.open('run')
+    restored = resumed.load_tables()['Customer']
+    pd.testing.assert_frame_equal(restored, mixed_customers)
+    assert list(restored['customerId'].map(type)) == [int, str, int, type(None)]
+
+
+def test_table_moving_between_formats_keeps_one_file(tmp_path, mixed_customers):
+    checkpoint = MergeCheckpoint(str(tmp_path))
+    checkpoint.open('run')
+    clean = mixed_customers.astype({'customerId': str})
+    assert checkpoint.save_task(finished_task('plan:Customer'), {'Customer': clean}, {}, {})
+    assert checkpoint.save_task(finished_task('extras:Customer'), {'Customer': mixed_customers}, {}, {})
+
+    assert sorted(p.suffix for p in tmp_path.glob('Customer*')) == ['.pkl']
+    pd.testing.assert_frame_equal(checkpoint.load_tables()['Customer'], mixed_customers)
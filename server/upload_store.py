@@ -0,0 +1,298 @@
+import asyncio
+import errno
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Any
+
+from fastapi import UploadFile
+
+# Size of each read from an uploaded file
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Largest accepted upload per file, configurable through the environment
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 200 * 1024 * 1024))
+
+# Size budget for the content-addressed blob store and how often it is checked
+UPLOAD_STORE_MAX_BYTES = int(os.getenv("UPLOAD_STORE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+GC_INTERVAL_SECONDS = 300
+
+# Temporary files older than this are leftovers of interrupted uploads; blobs
+# ingested more recently are kept until a manifest has had time to link them
+STALE_TMP_SECONDS = 3600
+
+# Errors of os.link that mean a hard link is not possible here, so a symlink is used
+HARD_LINK_UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EMLINK}
+
+ALLOWED_EXTENSIONS = {'.xlsx', '.xls', '.csv'}
+
+# Leading bytes every file of a binary format starts with
+FILE_SIGNATURES = {
+    '.xlsx': b'PK\x03\x04',  # Office Open XML is a zip archive
+    '.xls': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',  # OLE2 compound document
+}
+
+
+class UploadRejected(ValueError):
+    """Raised when an uploaded file fails validation."""
+
+
+def check_file_signature(filename: str, head: bytes) -> None:
+    """
+    Check that the first bytes of an upload match its extension.
+
+    Args:
+        filename: Name the client gave the file
+        head: First chunk of the file contents
+
+    Raises:
+        UploadRejected: If the extension is not accepted or the content does not match it
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in ALLOWED_EXTENSIONS:
+        raise UploadRejected(f"Unsupported file type '{extension or filename}'")
+
+    if extension == '.csv':
+        if b'\x00' in head:
+            raise UploadRejected("CSV file contains binary data")
+    elif not head.startswith(FILE_SIGNATURES[extension]):
+        raise UploadRejected(f"File content is not a valid {extension} file")
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: int = MAX_UPLOAD_BYTES) -> Dict[str, Any]:
+    """
+    Stream an uploaded file to disk in chunks, hashing it on the fly.
+
+    The file type is checked from the first chunk and the size cap is enforced
+    while reading, so invalid files are rejected without reading them fully.
+    Disk writes run in a worker thread to keep the event loop free.
+
+    Args:
+        file: The uploaded file
+        dest_path: Where to store the file
+        max_bytes: Largest accepted file size
+
+    Returns:
+        dict: SHA-256 hex digest and size in bytes of the stored file
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise UploadRejected(f"File exceeds the {max_bytes} byte upload limit")
+
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = f"{dest_path}.part"
+
+    out = await asyncio.to_thread(open, tmp_path, 'wb')
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if size == 0:
+                check_file_signature(file.filename, chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadRejected(f"File exceeds the {max_bytes} byte upload limit")
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+        if size == 0:
+            raise UploadRejected("File is empty")
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        await asyncio.to_thread(os.remove, tmp_path)
+        raise
+
+    await asyncio.to_thread(out.close)
+    await asyncio.to_thread(os.replace, tmp_path, dest_path)
+    return {'sha256': digest.hexdigest(), 'size': size}
+
+
+class UploadStore:
+    """
+    Content-addressed store for uploaded files.
+
+    Every upload is kept once as a blob named by its SHA-256. A user's
+    ``source/`` and ``target/`` directories only hold hard links (or symlinks
+    where hard links are unavailable) to those blobs, described by a
+    ``manifest.json`` in the user directory. Re-uploading an unchanged file
+    therefore only costs hashing it, and blobs no manifest refers to are
+    evicted least-recently-used first once the store exceeds its size budget.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, base_dir: str, max_bytes: int):
+        self.base_dir = base_dir
+        self.blob_dir = os.path.join(base_dir, "_blobs")
+        self.tmp_dir = os.path.join(self.blob_dir, "tmp")
+        self.max_bytes = max_bytes
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+        # Digest -> ingest time of blobs that may not be in any manifest yet
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def user_dir(self, user_id: str) -> str:
+        return os.path.join(self.base_dir, user_id)
+
+    async def ingest(self, file: UploadFile) -> Dict[str, Any]:
+        """
+        Stream an upload into the store.
+
+        Returns:
+            dict: SHA-256, size and whether an identical blob already existed
+        """
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        result = await save_upload(file, tmp_path)
+
+        # Protected from garbage collection until update_manifest can link it
+        with self.pending_lock:
+            self.pending[result['sha256']] = time.time()
+
+        blob_path = self.blob_path(result['sha256'])
+        reused = os.path.exists(blob_path)
+        if reused:
+            await asyncio.to_thread(os.remove, tmp_path)
+        else:
+            await asyncio.to_thread(os.makedirs, os.path.dirname(blob_path), exist_ok=True)
+            await asyncio.to_thread(os.replace, tmp_path, blob_path)
+
+        # The blob mtime doubles as its last-used time for eviction
+        await asyncio.to_thread(os.utime, blob_path)
+        return {**result, 'reused': reused}
+
+    def read_manifest(self, user_id: str) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(os.path.join(self.user_dir(user_id), self.MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def link_blob(self, digest: str, dest_path: str) -> None:
+        blob_path = self.blob_path(digest)
+        try:
+            os.link(blob_path, dest_path)
+        except OSError as e:
+            if e.errno not in HARD_LINK_UNSUPPORTED:
+                raise
+            os.symlink(os.path.abspath(blob_path), dest_path)
+
+    def update_manifest(self, user_id: str, files: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """
+        Point a user's upload directories at the given blobs.
+
+        Args:
+            user_id: Owner of the upload directories
+            files: ``{"source": {filename: sha256}, "target": {...}}``
+
+        Returns:
+            dict: The new manifest
+        """
+        previous = self.read_manifest(user_id)
+        user_dir = self.user_dir(user_id)
+
+        for kind, entries in files.items():
+            kind_dir = os.path.join(user_dir, kind)
+            os.makedirs(kind_dir, exist_ok=True)
+            old_entries = previous.get(kind, {})
+
+            # Drop files that are no longer part of the upload
+            for name in os.listdir(kind_dir):
+                if name not in entries:
+                    os.remove(os.path.join(kind_dir, name))
+
+            for name, digest in entries.items():
+                dest_path = os.path.join(kind_dir, name)
+                if old_entries.get(name) == digest and os.path.exists(dest_path):
+                    continue
+                if os.path.lexists(dest_path):
+                    os.remove(dest_path)
+                self.link_blob(digest, dest_path)
+
+        manifest = {**previous, **files}
+        manifest_path = os.path.join(user_dir, self.MANIFEST_NAME)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+        return manifest
+
+    def referenced_digests(self) -> set:
+        """Collect every blob hash referenced by a user manifest."""
+        referenced = set()
+        for name in os.listdir(self.base_dir):
+            if name == os.path.basename(self.blob_dir):
+                continue
+            manifest = self.read_manifest(name)
+            for entries in manifest.values():
+                referenced.update(entries.values())
+        return referenced
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """
+        Evict unreferenced blobs, least recently used first, until the store
+        fits its size budget. Also removes abandoned temporary files.
+        """
+        now = time.time()
+
+        # Taken before the manifests are read, so a blob linked in between is
+        # still seen as pending
+        with self.pending_lock:
+            for digest, ingested in list(self.pending.items()):
+                if now - ingested > STALE_TMP_SECONDS:
+                    del self.pending[digest]
+            pending = set(self.pending)
+        referenced = self.referenced_digests()
+
+        for name in os.listdir(self.tmp_dir):
+            tmp_path = os.path.join(self.tmp_dir, name)
+            try:
+                if now - os.path.getmtime(tmp_path) > STALE_TMP_SECONDS:
+                    os.remove(tmp_path)
+            except OSError:
+                continue
+
+        blobs = []
+        total_bytes = 0
+        for prefix in os.listdir(self.blob_dir):
+            prefix_dir = os.path.join(self.blob_dir, prefix)
+            if prefix_dir == self.tmp_dir or not os.path.isdir(prefix_dir):
+                continue
+            for digest in os.listdir(prefix_dir):
+                stat = os.stat(os.path.join(prefix_dir, digest))
+                total_bytes += stat.st_size
+                if digest not in referenced and digest not in pending:
+                    blobs.append((stat.st_mtime, stat.st_size, digest))
+
+        removed = 0
+        freed_bytes = 0
+        for _, size, digest in sorted(blobs):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(self.blob_path(digest))
+            except OSError:
+                continue
+            total_bytes -= size
+            freed_bytes += size
+            removed += 1
+
+        return {'removed': removed, 'freed_bytes': freed_bytes, 'total_bytes': total_bytes}
+
+    async def run_garbage_collector(self, interval: float = GC_INTERVAL_SECONDS) -> None:
+        """Periodically collect garbage in a worker thread until cancelled."""
+        while True:
+            try:
+                stats = await asyncio.to_thread(self.collect_garbage)
+                if stats['removed']:
+                    print(f"Upload store GC: removed {stats['removed']} blobs, "
+                          f"freed {stats['freed_bytes']} bytes, {stats['total_bytes']} bytes kept")
+            except Exception as e:
+                print(f"Upload store GC failed: {str(e)}")
+            await asyncio.sleep(interval)